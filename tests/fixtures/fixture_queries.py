@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture
+def query_budget(db):
+    """Бюджет SQL-запросов: `with query_budget(5): client.get(url)`."""
+    from core.testing import query_budget
+    return query_budget
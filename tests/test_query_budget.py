@@ -0,0 +1,18 @@
+import pytest
+from django.core.cache import cache
+
+pytestmark = [pytest.mark.django_db]
+
+
+class TestQueryBudget:
+
+    @pytest.mark.parametrize('url', ['/', '/group/test-link/', '/follow/'])
+    def test_feed_query_count_does_not_grow(self, user_client, query_budget,
+                                            few_posts_with_group, url):
+        cache.clear()
+        # у группы добавляется запрос для ETag
+        with query_budget(7 if url.startswith('/group/') else 6):
+            response = user_client.get(url)
+        assert response.status_code == 200, (
+            f'Страница `{url}` работает неправильно'
+        )
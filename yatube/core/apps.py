@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from .db import check_connections, connection_opened
+        connection_created.connect(
+            connection_opened, dispatch_uid='core.db.connection_opened'
+        )
+        request_started.connect(
+            check_connections, dispatch_uid='core.db.check_connections'
+        )
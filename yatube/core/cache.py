@@ -0,0 +1,98 @@
+"""Версионирование ключей кэша через счётчики поколений."""
+import time
+
+from django.core.cache import cache
+
+from .instrumentation import record_cache
+from .metrics import CACHE_REQUESTS
+from .routers import primary_reads
+
+GENERATION_KEY = 'generation:{}'
+
+
+def _initial():
+    # после вытеснения счётчика новое поколение не совпадёт со старыми
+    return int(time.time() * 1000)
+
+
+def get_generations(scopes):
+    """Текущие поколения scopes одним чтением кэша: {область: число}."""
+    keys = {scope: GENERATION_KEY.format(scope) for scope in scopes}
+    found = cache.get_many(keys.values())
+    for key in keys.values():
+        if key not in found:
+            cache.add(key, _initial(), None)
+            found[key] = cache.get(key)
+    return {scope: found[key] for scope, key in keys.items()}
+
+
+def get_generation(*scopes):
+    """Строка с текущими поколениями scopes для ключа кэша."""
+    generations = get_generations(scopes)
+    return '.'.join(str(generations[scope]) for scope in scopes)
+
+
+def bump_generation(*scopes):
+    """Начинает новое поколение: все ключи со старым устаревают."""
+    for scope in scopes:
+        key = GENERATION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial(), None)
+
+
+def _record(name, hit):
+    record_cache(hit)
+    if name:
+        CACHE_REQUESTS.inc(name=name, result='hit' if hit else 'miss')
+
+
+LOCK_TIMEOUT = 10
+COLD_WAIT = 2
+COLD_POLL = 0.05
+
+
+def get_or_rebuild(key, build, timeout, version=None, name=None):
+    """Значение из кэша с защитой от лавины перестроений.
+
+    Запись считается устаревшей по истечении timeout или при смене
+    version, но хранится ещё столько же. Перестраивает её только тот,
+    кто взял блокировку, остальные тем временем отдают старое значение.
+    Если значения нет совсем, остальные недолго ждут первого построения.
+    По name попадания и промахи учитываются в метриках. Значение
+    строится по основной базе: запись с отстающей реплики жила бы в
+    кэше до следующей смены версии.
+    """
+    lock_key = f'{key}:lock'
+    entry = cache.get(key)
+    if entry is not None:
+        value, entry_version, fresh_until = entry
+        if entry_version == version and time.time() < fresh_until:
+            _record(name, hit=True)
+            return value
+        locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+        if not locked:
+            _record(name, hit=True)
+            return value
+    else:
+        locked = cache.add(lock_key, 1, LOCK_TIMEOUT)
+    if not locked:
+        deadline = time.time() + COLD_WAIT
+        while time.time() < deadline:
+            time.sleep(COLD_POLL)
+            entry = cache.get(key)
+            if entry is not None:
+                _record(name, hit=True)
+                return entry[0]
+    _record(name, hit=False)
+    try:
+        with primary_reads():
+            value = build()
+        cache.set(key, (value, version, time.time() + timeout), timeout * 2)
+    finally:
+        # не дождавшись первого построения, строим без блокировки и чужую
+        # не снимаем
+        if locked:
+            cache.delete(lock_key)
+    return value
@@ -0,0 +1,122 @@
+"""Настройка и проверка подключений к базе.
+
+Каждому новому подключению к SQLite выставляются PRAGMA из
+settings.SQLITE_PRAGMAS. WAL позволяет читателям не ждать писателя (и
+наоборот), busy_timeout заставляет писателя дождаться блокировки
+вместо "database is locked".
+
+С CONN_MAX_AGE подключение воркера переживает запрос. В начале
+следующего запроса подключение баз с CONN_HEALTH_CHECKS проверяется
+(is_usable(), у SQLite - пробным SELECT 1), и мёртвое закрывается, чтобы
+запрос открыл новое вместо ошибки. Открытия, переиспользования и
+отбракованные подключения считаются в метрике
+yatube_db_connections_total.
+
+estimate_rows оценивает размер таблицы по статистике планировщика
+вместо COUNT(*); статистику собирает analyze.
+"""
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from .metrics import DB_CONNECTIONS
+
+# значения SQLite по умолчанию - для сравнения в нагрузочных прогонах
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'delete',
+    'synchronous': 'full',
+    'cache_size': -2000,
+    'mmap_size': 0,
+    'temp_store': 'default',
+}
+# журнал базы в памяти всегда memory, а WAL ей недоступен
+FILE_ONLY_PRAGMAS = ('journal_mode', 'mmap_size')
+# число строк таблицы по статистике; в sqlite_stat1 у каждого индекса
+# первое число - строки таблицы (у частичных индексов меньше)
+ESTIMATE_SQL = {
+    'sqlite': 'SELECT MAX(CAST(stat AS INTEGER)) FROM sqlite_stat1 '
+              'WHERE tbl = %s',
+    'postgresql': 'SELECT reltuples FROM pg_class '
+                  'WHERE oid = to_regclass(%s)',
+}
+
+
+def connection_opened(sender, connection, **kwargs):
+    DB_CONNECTIONS.inc(alias=connection.alias, event='opened')
+    if connection.vendor == 'sqlite':
+        configure_sqlite(connection)
+
+
+def configure_sqlite(connection):
+    in_memory = connection.is_in_memory_db()
+    raw = connection.connection
+    for name, value in settings.SQLITE_PRAGMAS.items():
+        if in_memory and name in FILE_ONLY_PRAGMAS:
+            continue
+        raw.execute(f'PRAGMA {name} = {value}')
+
+
+def pragmas(connection):
+    """Текущие значения PRAGMA из SQLITE_PRAGMAS для подключения."""
+    connection.ensure_connection()
+    raw = connection.connection
+    return {
+        name: raw.execute(f'PRAGMA {name}').fetchone()[0]
+        for name in settings.SQLITE_PRAGMAS
+    }
+
+
+def check_connections(**kwargs):
+    """request_started: учитывает подключения, оставшиеся с прошлых
+    запросов, и закрывает негодные. Устаревшие по CONN_MAX_AGE к этому
+    моменту уже закрыл close_old_connections."""
+    for connection in connections.all():
+        if connection.connection is None:
+            continue
+        alias = connection.alias
+        if connection.settings_dict.get('CONN_HEALTH_CHECKS') and (
+            not is_usable(connection)
+        ):
+            DB_CONNECTIONS.inc(alias=alias, event='unhealthy')
+            connection.close()
+            continue
+        DB_CONNECTIONS.inc(alias=alias, event='reused')
+
+
+def is_usable(connection):
+    """Пригодно ли открытое подключение для запросов."""
+    if connection.vendor != 'sqlite':
+        return connection.is_usable()
+    # is_usable() SQLite в Django 2.2 всегда True
+    try:
+        connection.connection.execute('SELECT 1')
+    except connection.Database.Error:
+        return False
+    return True
+
+
+def estimate_rows(model, using='default'):
+    """Число строк таблицы модели по статистике базы или None.
+
+    Оценка отстаёт от таблицы до следующего ANALYZE; None - статистики
+    нет или бэкенд её не даёт.
+    """
+    connection = connections[using]
+    sql = ESTIMATE_SQL.get(connection.vendor)
+    if sql is None:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [model._meta.db_table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        # sqlite_stat1 появляется только после первого ANALYZE
+        return None
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+def analyze(using='default'):
+    """Обновляет статистику планировщика (и оценки estimate_rows)."""
+    with connections[using].cursor() as cursor:
+        cursor.execute('ANALYZE')
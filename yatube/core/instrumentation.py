@@ -0,0 +1,115 @@
+"""Сбор показателей производительности текущего запроса.
+
+Пока открыт collect(), SQL-запросы всех подключений, отрисовка шаблонов
+и обращения к кэшу через core.cache учитываются в RequestMetrics.
+Вне collect() всё работает как обычно.
+"""
+import contextvars
+import time
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections
+from django.template.base import Template
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Показатели одного запроса; время - в миллисекундах."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.sql_queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def finish(self):
+        self.duration = (time.perf_counter() - self.started) * 1000
+
+    def as_dict(self):
+        return {
+            'duration_ms': round(self.duration, 2),
+            'sql_queries': self.sql_queries,
+            'sql_ms': round(self.sql_time, 2),
+            'template_ms': round(self.template_time, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
+
+    def server_timing(self):
+        """Значение заголовка Server-Timing."""
+        return ', '.join((
+            f'total;dur={self.duration:.2f}',
+            f'db;dur={self.sql_time:.2f};desc="{self.sql_queries} queries"',
+            f'tpl;dur={self.template_time:.2f}',
+            f'cache;desc="hit={self.cache_hits} miss={self.cache_misses}"',
+        ))
+
+
+def current():
+    """Показатели текущего запроса или None вне collect()."""
+    return _current.get()
+
+
+def record_cache(hit):
+    metrics = _current.get()
+    if metrics is None:
+        return
+    if hit:
+        metrics.cache_hits += 1
+    else:
+        metrics.cache_misses += 1
+
+
+def _count_sql(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.sql_queries += 1
+        metrics.sql_time += (time.perf_counter() - started) * 1000
+
+
+@contextmanager
+def collect():
+    """Собирает показатели кода внутри блока в RequestMetrics."""
+    metrics = RequestMetrics()
+    token = _current.set(metrics)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(_count_sql))
+            yield metrics
+    finally:
+        metrics.finish()
+        _current.reset(token)
+
+
+_original_render = Template.render
+
+
+def _timed_render(self, context):
+    metrics = _current.get()
+    if metrics is None:
+        return _original_render(self, context)
+    # вложенные include уже входят во время внешнего шаблона
+    metrics.template_depth += 1
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        metrics.template_depth -= 1
+        if not metrics.template_depth:
+            metrics.template_time += (time.perf_counter() - started) * 1000
+
+
+def instrument_templates():
+    """Включает учёт времени отрисовки шаблонов (один раз на процесс)."""
+    Template.render = _timed_render
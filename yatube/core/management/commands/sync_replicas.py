@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную SQLite-базу в реплики DATABASE_REPLICAS '
+            'через backup API; для локальной проверки чтения с реплик.')
+
+    def handle(self, *args, **options):
+        source = connections[DEFAULT_DB_ALIAS]
+        replicas = [connections[alias] for alias in settings.DATABASE_REPLICAS]
+        if not replicas:
+            raise CommandError('DATABASE_REPLICAS пуст.')
+        if any(db.vendor != 'sqlite' for db in [source, *replicas]):
+            raise CommandError(
+                'Копировать можно только SQLite; другие СУБД реплицируются '
+                'своими средствами.'
+            )
+        source.ensure_connection()
+        for replica in replicas:
+            replica.ensure_connection()
+            source.connection.backup(replica.connection)
+            self.stdout.write(self.style.SUCCESS(
+                f'Реплика {replica.alias} обновлена.'
+            ))
@@ -0,0 +1,302 @@
+"""Счётчики и гистограммы в формате Prometheus.
+
+Каждый процесс копит значения в памяти и не чаще раза в
+METRICS_FLUSH_INTERVAL секунд сбрасывает их в файл <pid>.json в каталоге
+METRICS_DIR. Эндпоинт /metrics складывает значения всех файлов, поэтому
+при нескольких воркерах видна сумма по всем; файлы завершившихся
+процессов при этом удаляются. Без METRICS_DIR видны только значения
+текущего процесса. Ошибка записи файла только пишется
+в лог: метрики не должны ронять запрос.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+
+logger = logging.getLogger('yatube.metrics')
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.pid = os.getpid()
+        self.flushed = 0.0
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f'Метрика {metric.name} уже зарегистрирована.')
+        self.metrics[metric.name] = metric
+
+    def check_pid(self):
+        # значения, унаследованные от родителя при fork, учтены в его файле
+        if os.getpid() != self.pid:
+            self.pid = os.getpid()
+            for metric in self.metrics.values():
+                metric.values.clear()
+
+    def state(self):
+        with self.lock:
+            return {
+                name: {
+                    'kind': metric.kind,
+                    'help': metric.documentation,
+                    'labels': list(metric.labelnames),
+                    'buckets': list(getattr(metric, 'buckets', ())),
+                    'samples': [
+                        [list(key), list(value)
+                         if isinstance(value, list) else value]
+                        for key, value in metric.values.items()
+                    ],
+                }
+                for name, metric in self.metrics.items()
+            }
+
+    def flush(self, force=False):
+        directory = settings.METRICS_DIR
+        if not directory:
+            return
+        # пока один поток пишет файл, остальные не ждут его, а пропускают
+        # сброс; принудительный сброс дожидается
+        if not self.flush_lock.acquire(blocking=force):
+            return
+        try:
+            now = time.monotonic()
+            if not force and (
+                now - self.flushed < settings.METRICS_FLUSH_INTERVAL
+            ):
+                return
+            self.flushed = now
+            self._write(directory)
+        except OSError:
+            logger.exception('Не удалось сбросить метрики в %s', directory)
+        finally:
+            self.flush_lock.release()
+
+    def _write(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{self.pid}.json')
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'w') as file:
+                json.dump(self.state(), file)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _states(self):
+        directory = settings.METRICS_DIR
+        if not directory or not os.path.isdir(directory):
+            return [self.state()]
+        states = []
+        for file_name in sorted(os.listdir(directory)):
+            if not file_name.endswith('.json'):
+                continue
+            path = os.path.join(directory, file_name)
+            pid = file_name[:-len('.json')]
+            if pid.isdigit() and not _alive(int(pid)):
+                # иначе значения давно завершённых воркеров (и воркеров с
+                # прошлых запусков) складывались бы с живыми вечно
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as file:
+                    states.append(json.load(file))
+            except (OSError, ValueError):
+                continue
+        return states
+
+    def collect(self):
+        """Значения всех процессов: {имя: описание с суммами samples}."""
+        self.check_pid()
+        self.flush(force=True)
+        merged = {}
+        for state in self._states():
+            for name, data in state.items():
+                target = merged.setdefault(name, {**data, 'samples': {}})
+                samples = target['samples']
+                for key, value in data['samples']:
+                    key = tuple(key)
+                    if key not in samples:
+                        samples[key] = value
+                    elif data['kind'] == Histogram.kind:
+                        samples[key] = [
+                            a + b for a, b in zip(samples[key], value)
+                        ]
+                    else:
+                        samples[key] += value
+        return merged
+
+    def expose(self):
+        """Текст в формате Prometheus text exposition 0.0.4."""
+        lines = []
+        for name, data in sorted(self.collect().items()):
+            lines.append(f'# HELP {name} {data["help"]}')
+            lines.append(f'# TYPE {name} {data["kind"]}')
+            for key, value in sorted(data['samples'].items()):
+                labels = list(zip(data['labels'], key))
+                if data['kind'] != Histogram.kind:
+                    lines.append(f'{name}{_labels(labels)} {value}')
+                    continue
+                *buckets, total, count = value
+                cumulative = 0
+                bounds = [_number(b) for b in data['buckets']] + ['+Inf']
+                for bound, bucket in zip(bounds, buckets):
+                    cumulative += bucket
+                    lines.append(
+                        f'{name}_bucket{_labels(labels + [("le", bound)])} '
+                        f'{cumulative}'
+                    )
+                lines.append(f'{name}_sum{_labels(labels)} {total}')
+                lines.append(f'{name}_count{_labels(labels)} {count}')
+        return '\n'.join(lines) + '\n'
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # процесс есть, но принадлежит другому пользователю
+        pass
+    return True
+
+
+def _number(value):
+    return repr(float(value))
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    inner = ','.join(f'{name}="{_escape(value)}"' for name, value in pairs)
+    return f'{{{inner}}}'
+
+
+REGISTRY = Registry()
+atexit.register(lambda: REGISTRY.flush(force=True))
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(),
+                 registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        self.values = {}
+        registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f'Метрика {self.name} ожидает метки {self.labelnames}.'
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _update(self, labels, update):
+        key = self._key(labels)
+        registry = self.registry
+        registry.check_pid()
+        with registry.lock:
+            self.values[key] = update(self.values.get(key))
+        registry.flush()
+
+
+class Counter(Metric):
+    """Монотонно растущий счётчик; скорость считает Prometheus (rate)."""
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        self._update(labels, lambda value: (value or 0) + amount)
+
+    def value(self, **labels):
+        return self.values.get(self._key(labels), 0)
+
+
+class Histogram(Metric):
+    """Распределение значений по корзинам с верхними границами buckets."""
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(),
+                 buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(buckets)
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, amount, **labels):
+        # корзины хранятся некумулятивными, последняя - +Inf; затем сумма
+        # и количество
+        index = len(self.buckets)
+        for position, bound in enumerate(self.buckets):
+            if amount <= bound:
+                index = position
+                break
+
+        def update(value):
+            value = value or [0] * (len(self.buckets) + 3)
+            value[index] += 1
+            value[-2] += amount
+            value[-1] += 1
+            return value
+
+        self._update(labels, update)
+
+    def time(self, **labels):
+        """Контекстный менеджер, замеряющий время блока в секундах."""
+        return _Timer(self, labels)
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(
+            time.perf_counter() - self.started, **self.labels
+        )
+
+
+REQUEST_LATENCY = Histogram(
+    'yatube_request_duration_seconds',
+    'Время обработки запроса по имени URL.',
+    ('view',),
+)
+CACHE_REQUESTS = Counter(
+    'yatube_cache_requests_total',
+    'Обращения к кэшу get_or_rebuild по имени фрагмента.',
+    ('name', 'result'),
+)
+DB_CONNECTIONS = Counter(
+    'yatube_db_connections_total',
+    'Подключения к БД: opened - новые, reused - оставшиеся с прошлого '
+    'запроса, unhealthy - закрытые проверкой.',
+    ('alias', 'event'),
+)
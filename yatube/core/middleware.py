@@ -0,0 +1,80 @@
+import json
+import logging
+import random
+import time
+
+from django.conf import settings
+
+from .instrumentation import collect, instrument_templates
+from .metrics import REQUEST_LATENCY
+from .routers import STICKY_COOKIE, replica_reads
+
+logger = logging.getLogger('yatube.performance')
+
+
+class PerformanceMiddleware:
+    """Замеряет запрос: общее время, число и время SQL-запросов, время
+    отрисовки шаблонов, попадания в кэш. Результат уходит в заголовок
+    Server-Timing и в лог yatube.performance одной JSON-строкой.
+
+    Замеряется доля запросов PERFORMANCE_SAMPLE_RATE, остальные
+    проходят без накладных расходов.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument_templates()
+
+    def __call__(self, request):
+        if random.random() >= settings.PERFORMANCE_SAMPLE_RATE:
+            return self.get_response(request)
+        with collect() as metrics:
+            response = self.get_response(request)
+        response['Server-Timing'] = metrics.server_timing()
+        match = request.resolver_match
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            **metrics.as_dict(),
+        }
+        logger.info(json.dumps(record, ensure_ascii=False))
+        return response
+
+
+class MetricsMiddleware:
+    """Записывает время обработки запроса в гистограмму по имени URL."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        response = self.get_response(request)
+        match = request.resolver_match
+        if match is not None and match.url_name:
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - started, view=match.view_name
+            )
+        return response
+
+
+class ReplicaMiddleware:
+    """Читает с реплик на время запроса (см. core.routers) и после
+    записи ставит cookie, закрепляющий чтения за основной базой."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = STICKY_COOKIE in request.COOKIES
+        with replica_reads(pinned) as state:
+            response = self.get_response(request)
+        if state.wrote:
+            response.set_cookie(
+                STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,125 @@
+"""Кэш целых страниц для анонимных посетителей.
+
+Ответ кэшируется по пути и номеру страницы (?page=); другие параметры
+запроса кэш отключают. Номер приводится к числу так же, как его
+понимает пагинатор, а ответ сохраняется, только если вьюха показала
+именно эту страницу: несуществующие номера не плодят записей. Вьюха
+помечает ответ областями, от которых он зависит (tag), ключ страницы
+записывается в реестр каждой области, и invalidate удаляет ровно ключи
+из реестров затронутых областей. Изменения, видимые на всех страницах,
+сбрасывают кэш целиком сменой поколения (clear).
+
+Промах строит страницу по основной базе: страница с отстающей реплики
+прожила бы в кэше весь PAGE_CACHE_TIMEOUT. Реестр обновляется без
+блокировки, поэтому при гонке двух записей ключ может в него не
+попасть; такая страница живёт не дольше PAGE_CACHE_TIMEOUT.
+"""
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+from .cache import _record, bump_generation, get_generation
+from .routers import primary_reads
+
+PAGES = 'pages'
+PAGE_KEY = 'page:{}:{}:{}'
+REGISTRY_KEY = 'page:keys:{}'
+CACHE_NAME = 'page'
+
+
+def tag(response, *scopes, page=1):
+    """Разрешает кэшировать ответ и указывает, что его сбрасывает;
+    page - номер показанной страницы ленты."""
+    response.page_cache_scopes = scopes
+    response.page_cache_page = page
+    return response
+
+
+def _cacheable(request):
+    return (
+        settings.PAGE_CACHE_TIMEOUT
+        and request.method in ('GET', 'HEAD')
+        and set(request.GET) <= {'page'}
+        and not request.user.is_authenticated
+    )
+
+
+def _page_number(request):
+    # нечисловой номер пагинатор тоже понимает как первую страницу
+    try:
+        return int(request.GET.get('page', 1))
+    except ValueError:
+        return 1
+
+
+def _page_key(request, page):
+    path = hashlib.md5(request.path.encode()).hexdigest()
+    return PAGE_KEY.format(get_generation(PAGES), path, page)
+
+
+def _register(key, scopes, timeout):
+    registry_keys = [REGISTRY_KEY.format(scope) for scope in scopes]
+    registries = cache.get_many(registry_keys)
+    for registry_key in registry_keys:
+        registries.setdefault(registry_key, set()).add(key)
+    cache.set_many(registries, timeout)
+
+
+def _from_cache(request, entry):
+    content, content_type, etag = entry
+    response = HttpResponse(content, content_type=content_type)
+    if etag:
+        response['ETag'] = etag
+        response = get_conditional_response(
+            request, etag=etag, response=response
+        )
+    return response
+
+
+def anonymous_page_cache(view):
+    """Отдаёт анонимам готовую страницу, не вызывая вьюху."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _cacheable(request):
+            return view(request, *args, **kwargs)
+        page = _page_number(request)
+        key = _page_key(request, page)
+        entry = cache.get(key)
+        _record(CACHE_NAME, hit=entry is not None)
+        if entry is not None:
+            return _from_cache(request, entry)
+        with primary_reads():
+            response = view(request, *args, **kwargs)
+        scopes = getattr(response, 'page_cache_scopes', None)
+        if (
+            scopes is not None
+            and getattr(response, 'page_cache_page', None) == page
+            and response.status_code == 200
+            and not response.streaming
+            and not response.cookies
+        ):
+            timeout = settings.PAGE_CACHE_TIMEOUT
+            _register(key, scopes, timeout)
+            cache.set(key, (
+                response.content, response['Content-Type'],
+                response.get('ETag'),
+            ), timeout)
+        return response
+    return wrapper
+
+
+def invalidate(*scopes):
+    """Удаляет страницы, помеченные любой из scopes."""
+    registry_keys = [REGISTRY_KEY.format(scope) for scope in scopes]
+    registries = cache.get_many(registry_keys)
+    keys = set().union(*registries.values())
+    cache.delete_many(list(keys) + registry_keys)
+
+
+def clear():
+    """Сбрасывает все страницы."""
+    bump_generation(PAGES)
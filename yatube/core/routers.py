@@ -0,0 +1,80 @@
+"""Чтение с реплик, запись в основную базу.
+
+Роутер отправляет чтения на реплики из settings.DATABASE_REPLICAS только
+внутри replica_reads() - его открывает ReplicaMiddleware на время
+запроса. Команды, фоновые потоки и сигналы вне запроса читают основную
+базу.
+
+Чтобы пользователь видел свои изменения, после первой записи в запросе
+чтения до его конца идут в основную базу, а в ответ ставится cookie: ещё
+REPLICA_STICKY_SECONDS его запросы тоже читают основную базу, пока
+реплики догоняют.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+STICKY_COOKIE = 'read_primary'
+
+_state = ContextVar('replica_state', default=None)
+
+
+class ReplicaState:
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+
+
+@contextmanager
+def replica_reads(pinned=False):
+    """Разрешает чтение с реплик в блоке; pinned - читать основную."""
+    state = ReplicaState(pinned)
+    token = _state.set(state)
+    try:
+        yield state
+    finally:
+        _state.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """Временно читает основную базу, например при построении кэша,
+    который переживёт отставание реплики."""
+    state = _state.get()
+    if state is None or state.pinned:
+        yield
+        return
+    state.pinned = True
+    try:
+        yield
+    finally:
+        # запись внутри блока закрепляет запрос за основной базой и дальше
+        state.pinned = state.wrote
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        replicas = settings.DATABASE_REPLICAS
+        if state is None or state.pinned or not replicas:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.pinned = state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # все базы - копии одной и той же
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # схема реплик приходит с основной базы
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
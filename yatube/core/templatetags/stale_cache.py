@@ -0,0 +1,59 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core.cache import get_or_rebuild
+
+register = template.Library()
+
+
+class StaleCacheNode(template.Node):
+    def __init__(self, nodelist, timeout, fragment_name, vary_on, version):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+        self.version = version
+
+    def render(self, context):
+        try:
+            timeout = int(self.timeout.resolve(context))
+        except (ValueError, TypeError):
+            raise template.TemplateSyntaxError(
+                f'"stalecache" tag got a non-integer timeout value: '
+                f'{self.timeout.var!r}'
+            )
+        key = make_template_fragment_key(
+            self.fragment_name,
+            [var.resolve(context) for var in self.vary_on]
+        )
+        version = self.version.resolve(context) if self.version else None
+        return get_or_rebuild(
+            key, lambda: self.nodelist.render(context), timeout, version,
+            name=self.fragment_name
+        )
+
+
+@register.tag('stalecache')
+def do_stalecache(parser, token):
+    """Кэширует фрагмент как {% cache %}, но при устаревании или смене
+    версии фрагмент перестраивает один запрос, остальные отдают старый.
+
+        {% stalecache 3600 index_page page_obj.number version=gen %}
+    """
+    nodelist = parser.parse(('endstalecache',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f'"{bits[0]}" tag requires at least 2 arguments.'
+        )
+    version = None
+    if bits[-1].startswith('version='):
+        version = parser.compile_filter(bits.pop()[len('version='):])
+    return StaleCacheNode(
+        nodelist,
+        parser.compile_filter(bits[1]),
+        bits[2],
+        [parser.compile_filter(bit) for bit in bits[3:]],
+        version,
+    )
@@ -0,0 +1,70 @@
+"""Бюджеты SQL-запросов для тестов.
+
+    with query_budget(5):
+        client.get(url)
+
+    @query_budget(5)
+    def test_view(self): ...
+
+Блок падает с QueryBudgetExceeded, если выполнено больше запросов, чем
+объявлено, или один и тот же запрос повторился (типичный признак N+1:
+связанный объект читается заново в цикле шаблона).
+"""
+from collections import Counter
+from contextlib import ContextDecorator
+
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.utils import CaptureQueriesContext
+
+# служебные запросы транзакций тестов не считаются
+IGNORED_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT')
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class query_budget(ContextDecorator):
+    def __init__(self, max_queries, allow_duplicates=False,
+                 using=DEFAULT_DB_ALIAS):
+        self.max_queries = max_queries
+        self.allow_duplicates = allow_duplicates
+        self.using = using
+        self.queries = []
+
+    def __enter__(self):
+        self.context = CaptureQueriesContext(connections[self.using])
+        self.context.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.context.__exit__(exc_type, exc_value, traceback)
+        if exc_type is not None:
+            return False
+        self.queries = [
+            query['sql'] for query in self.context.captured_queries
+            if not query['sql'].startswith(IGNORED_PREFIXES)
+        ]
+        self.check()
+        return False
+
+    def check(self):
+        listing = '\n'.join(
+            f'{number}. {sql}'
+            for number, sql in enumerate(self.queries, start=1)
+        )
+        if len(self.queries) > self.max_queries:
+            raise QueryBudgetExceeded(
+                f'Выполнено {len(self.queries)} запросов при бюджете '
+                f'{self.max_queries}:\n{listing}'
+            )
+        if self.allow_duplicates:
+            return
+        duplicates = [
+            sql for sql, count in Counter(self.queries).items() if count > 1
+        ]
+        if duplicates:
+            raise QueryBudgetExceeded(
+                'Повторяющиеся запросы (N+1?):\n'
+                + '\n'.join(duplicates) + f'\nВсе запросы:\n{listing}'
+            )
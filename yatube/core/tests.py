@@ -0,0 +1,531 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.core.management import call_command
+from django.core.servers.basehttp import WSGIServer
+from django.template import Context, Template
+from django.test import (
+    LiveServerTestCase, SimpleTestCase, TestCase, TransactionTestCase,
+    override_settings
+)
+from django.test.testcases import LiveServerThread, QuietWSGIRequestHandler
+from django.urls import reverse
+
+from posts.models import Post
+
+from .cache import bump_generation, get_generation, get_or_rebuild
+from .db import check_connections, pragmas
+from .instrumentation import collect, instrument_templates
+from .metrics import (
+    DB_CONNECTIONS, REQUEST_LATENCY, Counter, Histogram, Registry
+)
+from .routers import STICKY_COOKIE, primary_reads, replica_reads
+from .testing import QueryBudgetExceeded, query_budget
+
+
+class GetOrRebuildTest(SimpleTestCase):
+    """Тест кэша с защитой от лавины перестроений."""
+
+    def setUp(self):
+        cache.clear()
+        self.builds = 0
+
+    def build(self):
+        self.builds += 1
+        return f'value {self.builds}'
+
+    def test_fresh_value_is_cached(self):
+        """Проверяет, что свежее значение не перестраивается."""
+        self.assertEqual(get_or_rebuild('key', self.build, 60), 'value 1')
+        self.assertEqual(get_or_rebuild('key', self.build, 60), 'value 1')
+        self.assertEqual(self.builds, 1)
+
+    def test_new_version_rebuilds(self):
+        """Проверяет, что смена версии перестраивает значение."""
+        get_or_rebuild('key', self.build, 60, version=1)
+        self.assertEqual(
+            get_or_rebuild('key', self.build, 60, version=2), 'value 2'
+        )
+
+    def test_stale_value_served_while_locked(self):
+        """Проверяет, что пока другой процесс перестраивает значение,
+        отдаётся старое."""
+        get_or_rebuild('key', self.build, 60, version=1)
+        cache.add('key:lock', 1)
+        self.assertEqual(
+            get_or_rebuild('key', self.build, 60, version=2), 'value 1'
+        )
+        self.assertEqual(self.builds, 1)
+
+    def test_expired_value_rebuilt(self):
+        """Проверяет перестроение по истечении времени жизни."""
+        with mock.patch('core.cache.time.time', return_value=1000):
+            get_or_rebuild('key', self.build, 60)
+        with mock.patch('core.cache.time.time', return_value=1061):
+            self.assertEqual(
+                get_or_rebuild('key', self.build, 60), 'value 2'
+            )
+
+    def test_lock_released_on_error(self):
+        """Проверяет, что ошибка построения не оставляет блокировку."""
+        def fail():
+            raise RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            get_or_rebuild('key', fail, 60)
+        self.assertIsNone(cache.get('key:lock'))
+
+    def test_cold_wait_keeps_foreign_lock(self):
+        """Проверяет, что не дождавшийся построения не снимает чужую
+        блокировку."""
+        cache.add('key:lock', 1)
+        with mock.patch('core.cache.COLD_WAIT', 0):
+            self.assertEqual(get_or_rebuild('key', self.build, 60), 'value 1')
+        self.assertEqual(cache.get('key:lock'), 1)
+
+    def test_generation_bump(self):
+        """Проверяет, что поколение меняется после bump_generation."""
+        before = get_generation('scope')
+        self.assertEqual(get_generation('scope'), before)
+        bump_generation('scope')
+        self.assertNotEqual(get_generation('scope'), before)
+
+    def test_stalecache_tag(self):
+        """Проверяет, что тег отдаёт фрагмент из кэша до смены версии."""
+        template = Template(
+            '{% load stale_cache %}'
+            '{% stalecache 60 fragment page version=version %}'
+            '{{ text }}{% endstalecache %}'
+        )
+
+        def render(**kwargs):
+            return template.render(Context(dict(page=1, **kwargs)))
+
+        self.assertEqual(render(text='old', version=1), 'old')
+        self.assertEqual(render(text='new', version=1), 'old')
+        self.assertEqual(render(text='new', version=2), 'new')
+
+
+class PerformanceMiddlewareTest(TestCase):
+    """Тест замеров производительности запросов."""
+
+    def setUp(self):
+        cache.clear()
+
+    def timings(self, response):
+        return dict(
+            part.split(';', 1) for part in
+            response['Server-Timing'].split(', ')
+        )
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1)
+    def test_metrics_in_header_and_log(self):
+        """Проверяет заголовок Server-Timing и запись в лог."""
+        user = get_user_model().objects.create(username='author')
+        url = reverse('posts:profile', args=(user.username,))
+        with self.assertLogs('yatube.performance', 'INFO') as logs:
+            first = self.client.get(url)
+            second = self.client.get(url)
+        timings = self.timings(first)
+        self.assertIn('total', timings)
+        self.assertIn('tpl', timings)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['view'], 'posts:profile')
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['sql_queries'], 0)
+        self.assertEqual(
+            timings['db'].split('desc=')[1],
+            f'"{record["sql_queries"]} queries"'
+        )
+        self.assertGreater(record['template_ms'], 0)
+        # страница целиком и фрагмент ленты
+        self.assertEqual(record['cache_misses'], 2)
+        again = json.loads(logs.records[1].getMessage())
+        self.assertEqual((again['cache_hits'], again['cache_misses']), (1, 0))
+        self.assertIn('Server-Timing', second)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0)
+    def test_unsampled_request_not_measured(self):
+        """Проверяет, что запросы вне выборки не замеряются."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn('Server-Timing', response)
+
+    def test_nested_templates_counted_once(self):
+        """Проверяет, что include не удваивает время отрисовки."""
+        instrument_templates()
+        template = Template('{% include "posts/includes/paginator.html" %}')
+        with collect() as metrics:
+            template.render(Context())
+        self.assertEqual(metrics.template_depth, 0)
+        self.assertGreater(metrics.template_time, 0)
+        self.assertEqual(metrics.sql_queries, 0)
+
+
+class MetricsTest(TestCase):
+    """Тест реестра метрик и эндпоинта /metrics."""
+
+    def test_exposition_format(self):
+        """Проверяет текстовый формат счётчиков и гистограмм."""
+        registry = Registry()
+        counter = Counter('test_total', 'Счётчик.', ('kind',), registry)
+        histogram = Histogram(
+            'test_seconds', 'Гистограмма.', buckets=(0.1, 1), registry=registry
+        )
+        counter.inc(kind='a "b"')
+        counter.inc(2, kind='a "b"')
+        for amount in (0.05, 0.5, 5):
+            histogram.observe(amount)
+        text = registry.expose()
+        self.assertIn('# TYPE test_total counter', text)
+        self.assertIn('test_total{kind="a \\"b\\""} 3', text)
+        self.assertIn('test_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('test_seconds_bucket{le="1.0"} 2', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('test_seconds_count 3', text)
+        with self.assertRaises(ValueError):
+            counter.inc(other='label')
+
+    def test_processes_are_summed(self):
+        """Проверяет сложение значений разных процессов через файлы."""
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS_DIR=directory):
+                registry = Registry()
+                counter = Counter('test_total', 'Счётчик.', (), registry)
+                counter.inc()
+                # файл другого воркера
+                with open(os.path.join(directory, '1.json'), 'w') as file:
+                    json.dump(registry.state(), file)
+                counter.inc()
+                merged = registry.collect()
+        self.assertEqual(merged['test_total']['samples'], {(): 3})
+
+    def test_dead_processes_removed(self):
+        """Проверяет, что файл завершившегося процесса удаляется и не
+        попадает в сумму."""
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS_DIR=directory):
+                registry = Registry()
+                counter = Counter('test_total', 'Счётчик.', (), registry)
+                counter.inc()
+                path = os.path.join(directory, f'{process.pid}.json')
+                with open(path, 'w') as file:
+                    json.dump(registry.state(), file)
+                merged = registry.collect()
+                self.assertFalse(os.path.exists(path))
+        self.assertEqual(merged['test_total']['samples'], {(): 1})
+
+    def test_concurrent_flush(self):
+        """Проверяет сброс метрик из нескольких потоков сразу."""
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(METRICS_DIR=directory):
+                registry = Registry()
+                counter = Counter('test_total', 'Счётчик.', (), registry)
+                with ThreadPoolExecutor(max_workers=8) as pool:
+                    list(pool.map(lambda _: counter.inc(), range(200)))
+                registry.flush(force=True)
+                self.assertEqual(
+                    os.listdir(directory), [f'{os.getpid()}.json']
+                )
+                merged = registry.collect()
+        self.assertEqual(merged['test_total']['samples'], {(): 200})
+
+    def test_flush_error_logged(self):
+        """Проверяет, что ошибка записи файла метрик не доходит до
+        вызывающего кода."""
+        with tempfile.TemporaryDirectory() as directory:
+            registry = Registry()
+            counter = Counter('test_total', 'Счётчик.', (), registry)
+            with override_settings(METRICS_DIR=directory), mock.patch(
+                'core.metrics.os.replace', side_effect=OSError('диск полон')
+            ), self.assertLogs('yatube.metrics', 'ERROR'):
+                counter.inc()
+            self.assertEqual(counter.values[()], 1)
+            self.assertEqual(os.listdir(directory), [])
+
+    def test_endpoint_restricted(self):
+        """Проверяет, что /metrics закрыт для гостей и пользователей не из
+        персонала, но открыт персоналу и адресам из METRICS_ALLOWED_IPS."""
+        url = reverse('metrics')
+        User = get_user_model()
+        user = User.objects.create(username='user')
+        staff = User.objects.create(username='staff', is_staff=True)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(staff)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        self.client.logout()
+        with override_settings(METRICS_ALLOWED_IPS=['10.0.0.1']):
+            self.assertEqual(
+                self.client.get(url, REMOTE_ADDR='10.0.0.1').status_code, 200
+            )
+            self.assertEqual(self.client.get(url).status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_endpoint(self):
+        """Проверяет, что /metrics отдаёт латентность и счётчики постов."""
+        self.client.get(reverse('posts:index'))
+        latency = REQUEST_LATENCY.values[('posts:index',)]
+        user = get_user_model().objects.create(username='author')
+        user.posts.create(text='Текст')
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn('yatube_request_duration_seconds_count'
+                      f'{{view="posts:index"}} {latency[-1]}', text)
+        self.assertIn('yatube_posts_created_total', text)
+        self.assertIn(
+            'yatube_cache_requests_total{name="index_page",result=', text
+        )
+
+
+class QueryBudgetTest(TestCase):
+    """Тест бюджетов SQL-запросов."""
+
+    def setUp(self):
+        self.User = get_user_model()
+
+    def test_budget_exceeded(self):
+        """Проверяет, что превышение бюджета роняет блок."""
+        with self.assertRaises(QueryBudgetExceeded):
+            with query_budget(1):
+                self.User.objects.exists()
+                self.User.objects.count()
+
+    def test_duplicates(self):
+        """Проверяет, что повтор запроса считается N+1."""
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'Повторяющиеся'):
+            with query_budget(5):
+                self.User.objects.count()
+                self.User.objects.count()
+        with query_budget(2, allow_duplicates=True):
+            self.User.objects.count()
+            self.User.objects.count()
+
+    def test_decorator(self):
+        """Проверяет работу как декоратора."""
+        @query_budget(0)
+        def query():
+            return self.User.objects.count()
+
+        with self.assertRaises(QueryBudgetExceeded):
+            query()
+
+
+class SqlitePragmasTest(SimpleTestCase):
+    """Тест настройки подключений к SQLite."""
+
+    def test_file_database(self):
+        """Проверяет PRAGMA нового подключения к файловой базе."""
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = DatabaseWrapper(dict(
+                connection.settings_dict,
+                NAME=os.path.join(directory, 'db.sqlite3')
+            ), alias='pragmas')
+            try:
+                values = pragmas(wrapper)
+            finally:
+                wrapper.close()
+        self.assertEqual(values['journal_mode'], 'wal')
+        self.assertEqual(values['synchronous'], 1)
+        self.assertEqual(values['cache_size'], -64000)
+        self.assertEqual(values['busy_timeout'], 5000)
+
+    def test_default_pragmas(self):
+        """Проверяет, что настройки можно вернуть к умолчаниям SQLite."""
+        with tempfile.TemporaryDirectory() as directory:
+            name = os.path.join(directory, 'db.sqlite3')
+            with override_settings(SQLITE_PRAGMAS={'journal_mode': 'delete'}):
+                wrapper = DatabaseWrapper(
+                    dict(connection.settings_dict, NAME=name), alias='p'
+                )
+                try:
+                    values = pragmas(wrapper)
+                finally:
+                    wrapper.close()
+        self.assertEqual(values, {'journal_mode': 'delete'})
+
+
+class ConnectionHealthTest(SimpleTestCase):
+    """Тест проверки подключений перед переиспользованием."""
+
+    def check(self, wrapper):
+        with mock.patch('core.db.connections') as handler:
+            handler.all.return_value = [wrapper]
+            check_connections()
+
+    def test_reuse_and_health_check(self):
+        """Проверяет учёт живого подключения и закрытие мёртвого."""
+        with tempfile.TemporaryDirectory() as directory:
+            wrapper = DatabaseWrapper(dict(
+                connection.settings_dict, CONN_HEALTH_CHECKS=True,
+                NAME=os.path.join(directory, 'db.sqlite3')
+            ), alias='health')
+            try:
+                self.check(wrapper)
+                self.assertEqual(
+                    DB_CONNECTIONS.values.get(('health', 'reused'), 0), 0
+                )
+                wrapper.ensure_connection()
+                self.assertEqual(
+                    DB_CONNECTIONS.values[('health', 'opened')], 1
+                )
+                self.check(wrapper)
+                self.assertEqual(
+                    DB_CONNECTIONS.values[('health', 'reused')], 1
+                )
+                # подключение умерло под обёрткой, is_usable() этого не
+                # видит
+                wrapper.connection.close()
+                self.assertTrue(wrapper.is_usable())
+                self.check(wrapper)
+                self.assertIsNone(wrapper.connection)
+                self.assertEqual(
+                    DB_CONNECTIONS.values[('health', 'unhealthy')], 1
+                )
+            finally:
+                wrapper.close()
+
+
+class WorkerServerThread(LiveServerThread):
+    """Сервер с одним постоянным потоком-воркером, как sync-воркер
+    gunicorn: у ThreadedWSGIServer каждый запрос идёт в новом потоке со
+    своим подключением, и переиспользовать его некому."""
+
+    def _create_server(self):
+        return WSGIServer(
+            (self.host, self.port), QuietWSGIRequestHandler,
+            allow_reuse_address=False
+        )
+
+
+class LiveServerMixin:
+    def get(self, url):
+        with urllib.request.urlopen(self.live_server_url + url) as response:
+            return response.status, response.read().decode()
+
+
+class PersistentConnectionTest(LiveServerMixin, LiveServerTestCase):
+    """Тест переиспользования подключения воркером сервера."""
+    server_thread_class = WorkerServerThread
+
+    @override_settings(METRICS_ALLOWED_IPS=['127.0.0.1'])
+    def test_connection_reused_between_requests(self):
+        """Проверяет, что запросы не открывают подключение заново."""
+        opened = DB_CONNECTIONS.values.get(('default', 'opened'), 0)
+        reused = DB_CONNECTIONS.values.get(('default', 'reused'), 0)
+        for _ in range(3):
+            self.assertEqual(self.get(reverse('posts:index'))[0], 200)
+        self.assertEqual(
+            DB_CONNECTIONS.values.get(('default', 'opened'), 0), opened
+        )
+        self.assertGreaterEqual(
+            DB_CONNECTIONS.values[('default', 'reused')], reused + 3
+        )
+        status, text = self.get(reverse('metrics'))
+        self.assertEqual(status, 200)
+        self.assertIn(
+            'yatube_db_connections_total{alias="default",event="reused"}',
+            text
+        )
+
+
+class ThreadedServerConnectionTest(LiveServerMixin, LiveServerTestCase):
+    """Тест подключений под многопоточным сервером."""
+
+    def test_concurrent_requests(self):
+        """Проверяет, что параллельные запросы открывают свои подключения
+        и все успешно обслуживаются."""
+        opened = DB_CONNECTIONS.values.get(('default', 'opened'), 0)
+        url = reverse('posts:index')
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(self.get, [url] * 8))
+        self.assertEqual([status for status, _ in results], [200] * 8)
+        self.assertGreater(
+            DB_CONNECTIONS.values[('default', 'opened')], opened
+        )
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTest(TransactionTestCase):
+    """Тест чтения с реплики и закрепления за основной базой."""
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.author = get_user_model().objects.create_user(
+            'author', password='password'
+        )
+        self.author.posts.create(text='Старый пост')
+        call_command('sync_replicas', stdout=StringIO())
+        self.unsynced = self.author.posts.create(text='Пост не на реплике')
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_reads_go_to_replica(self):
+        """Проверяет, что страницы читаются с реплики."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.unsynced.pk,))
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn(STICKY_COOKIE, response.cookies)
+
+    def test_page_cache_built_from_primary(self):
+        """Проверяет, что кэш страниц не строится по отстающей реплике."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Пост не на реплике')
+        cached = self.client.get(reverse('posts:index'))
+        self.assertIsNone(cached.context)
+        self.assertContains(cached, 'Пост не на реплике')
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_read_your_writes(self):
+        """Проверяет, что после записи пользователь видит свои данные."""
+        # сессия входа пишется в основную базу, реплика о ней не знает
+        self.client.post(
+            reverse('users:login'),
+            {'username': 'author', 'password': 'password'}
+        )
+        self.assertIn(STICKY_COOKIE, self.client.cookies)
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Свежий пост'},
+            follow=True
+        )
+        self.assertContains(response, 'Свежий пост')
+        fresh = Post.objects.get(text='Свежий пост')
+        detail = reverse('posts:post_detail', args=(fresh.pk,))
+        self.assertEqual(self.client.get(detail).status_code, 200)
+        self.client.cookies.pop(STICKY_COOKIE)
+        self.assertEqual(self.client.get(detail).status_code, 404)
+
+    def test_write_inside_primary_reads_keeps_pin(self):
+        """Проверяет, что запись внутри primary_reads закрепляет запрос
+        за основной базой и после блока."""
+        with replica_reads() as state:
+            with primary_reads():
+                Post.objects.create(author=self.author, text='Новый пост')
+            self.assertTrue(state.pinned)
+            self.assertEqual(Post.objects.count(), 3)
+
+    def test_cache_built_from_primary(self):
+        """Проверяет, что кэш ленты не строится по отстающей реплике."""
+        with replica_reads() as state:
+            self.assertEqual(
+                get_or_rebuild('count', Post.objects.count, 60), 2
+            )
+            self.assertFalse(state.pinned)
+        self.assertEqual(
+            Post.objects.using('replica').count(), 1
+        )
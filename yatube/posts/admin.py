@@ -1,15 +1,142 @@
+from django import forms
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
 
 from .models import Group, Post, Comment
+from .search import search_posts
+from .utils import EstimatedCountPaginator
 
 
-class PostAdmin(admin.ModelAdmin):
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    """Autocomplete-виджет, которому выбранный объект уже известен.
+
+    Обычный AutocompleteSelect запрашивает подпись выбранного объекта на
+    каждой строке списка изменений; здесь объект загружен вместе со
+    строкой через list_select_related и передаётся формой в selected.
+    """
+    selected = None
+
+    def optgroups(self, name, value, attr=None):
+        obj = self.selected
+        if obj is None or [v for v in value if v] != [str(obj.pk)]:
+            return super().optgroups(name, value, attr)
+        options = []
+        if not self.is_required:
+            options.append(self.create_option(name, '', '', False, 0))
+        options.append(self.create_option(
+            name, obj.pk, self.choices.field.label_from_instance(obj),
+            True, len(options)
+        ))
+        return [(None, options, 0)]
+
+
+class PreloadedChangeListForm(forms.ModelForm):
+    """Форма строки списка изменений: autocomplete-полям передаются
+    связанные объекты самой строки."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk is None:
+            return
+        for name, field in self.fields.items():
+            # виджет обёрнут RelatedFieldWidgetWrapper
+            widget = getattr(field.widget, 'widget', field.widget)
+            if isinstance(widget, PreloadedAutocompleteSelect):
+                widget.selected = getattr(self.instance, name)
+
+
+class InputFilter(admin.SimpleListFilter):
+    """Фильтр с полем ввода вместо списка всех значений.
+
+    Варианты RelatedFieldListFilter - это все строки связанной таблицы
+    на каждом открытии списка; здесь значение вводится вручную.
+    """
+    template = 'admin/input_filter.html'
+    lookup = None
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(**{self.lookup: self.value()})
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            'selected': not self.value(),
+            'query_string': changelist.get_query_string(
+                remove=[self.parameter_name]
+            ),
+            # остальные параметры списка, чтобы форма их не сбросила
+            'query_parts': [
+                (key, value) for key, value in changelist.params.items()
+                if key != self.parameter_name
+            ],
+        }
+
+
+class AuthorFilter(InputFilter):
+    title = 'автор'
+    parameter_name = 'author'
+    lookup = 'author__username'
+
+
+class PostFilter(InputFilter):
+    title = 'номер поста'
+    parameter_name = 'post'
+    lookup = 'post_id'
+
+    def queryset(self, request, queryset):
+        if self.value() and not self.value().isdigit():
+            return queryset.none()
+        return super().queryset(request, queryset)
+
+
+class ChangeListAdmin(admin.ModelAdmin):
+    """Список изменений, стоимость которого не зависит от размера таблиц.
+
+    Число строк - оценка вместо COUNT(*) и без второго счёта всей
+    таблицы, связанные объекты - через autocomplete и raw_id вместо
+    <select> со всеми строками, выбранные значения autocomplete
+    берутся из list_select_related.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if 'widget' not in kwargs and (
+            db_field.name in self.get_autocomplete_fields(request)
+        ):
+            kwargs['widget'] = PreloadedAutocompleteSelect(
+                db_field.remote_field, self.admin_site,
+                using=kwargs.get('using')
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_form(self, request, **kwargs):
+        kwargs.setdefault('form', PreloadedChangeListForm)
+        return super().get_changelist_form(request, **kwargs)
+
+
+class PostAdmin(ChangeListAdmin):
     list_display = ('pk', 'text', 'pub_date',
                     'author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
+    autocomplete_fields = ('author', 'group')
+
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по тексту через индекс posts.search вместо LIKE."""
+        if not search_term:
+            return queryset, False
+        return search_posts(queryset, search_term), False
 
 
 class GroupAdmin(admin.ModelAdmin):
@@ -20,15 +147,18 @@ class GroupAdmin(admin.ModelAdmin):
     list_display_links = ('slug',)
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(ChangeListAdmin):
     list_display = ('post', 'author', 'text', 'created')
-    search_fields = ('text', 'author', 'created')
-    list_filter = ('author', 'post', 'created')
+    search_fields = ('text', 'author__username')
+    list_filter = (AuthorFilter, PostFilter, 'created')
     empty_value_display = '-пусто-'
     list_display_links = ('text',)
     list_editable = ('author',)
-    list_select_related = ('author',)
-    ordering = ('post',)
+    list_select_related = ('author', 'post')
+    autocomplete_fields = ('author',)
+    raw_id_fields = ('post', 'parent')
+    # сортировка по посту - это JOIN и сортировка всей таблицы
+    ordering = ('-pk',)
 
 
 admin.site.register(Post, PostAdmin)
@@ -0,0 +1,263 @@
+"""Нагрузочный прогон: смесь запросов к лентам от нескольких клиентов.
+
+Клиенты работают в потоках и обращаются либо к приложению напрямую
+через django.test.Client, либо к запущенному серверу по HTTP. К чтению
+лент можно подмешать долю записей (посты, комментарии, подписки). Для
+каждого вида запроса считаются перцентили задержки, для всего прогона -
+запросы в секунду.
+"""
+import http.cookiejar
+import math
+import random
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from .models import Follow, Group, Post, User
+
+# доли видов страниц в смеси запросов
+MIX = {
+    'posts:index': 30,
+    'posts:group_list': 15,
+    'posts:profile': 20,
+    'posts:post_detail': 25,
+    'posts:follow_index': 10,
+}
+# доли записей; выполняются от имени читателя ленты подписок
+WRITE_MIX = {
+    'posts:post_create': 30,
+    'posts:add_comment': 60,
+    'posts:profile_follow': 5,
+    'posts:profile_unfollow': 5,
+}
+# доля запросов не к первой странице ленты
+DEEP_PAGE_SHARE = 0.2
+DEEP_PAGES = 5
+SAMPLE_SIZE = 500
+PERCENTILES = (50, 95, 99)
+
+
+class Targets:
+    """Адреса, из которых собирается смесь запросов."""
+
+    def __init__(self, slugs, usernames, post_ids, reader=None):
+        self.slugs = slugs
+        self.usernames = usernames
+        self.post_ids = post_ids
+        self.reader = reader
+
+    @classmethod
+    def from_db(cls):
+        follow = Follow.objects.select_related('user').first()
+        return cls(
+            slugs=list(Group.objects.values_list('slug', flat=True)[
+                :SAMPLE_SIZE
+            ]),
+            usernames=list(User.objects.filter(
+                stats__posts_count__gt=0
+            ).values_list('username', flat=True)[:SAMPLE_SIZE]),
+            post_ids=list(Post.objects.order_by('?').values_list(
+                'pk', flat=True
+            )[:SAMPLE_SIZE]),
+            reader=follow.user.username if follow else None,
+        )
+
+    def mix(self, write_share=0.0):
+        """Виды запросов, для которых есть данные, с их весами."""
+        available = {
+            'posts:index': True,
+            'posts:group_list': self.slugs,
+            'posts:profile': self.usernames,
+            'posts:post_detail': self.post_ids,
+            'posts:follow_index': self.reader,
+            'posts:post_create': self.reader,
+            'posts:add_comment': self.reader and self.post_ids,
+            'posts:profile_follow': self.reader and self.usernames,
+            'posts:profile_unfollow': self.reader and self.usernames,
+        }
+        weights = {name: weight * (1 - write_share)
+                   for name, weight in MIX.items()}
+        if write_share:
+            weights.update(
+                (name, weight * write_share)
+                for name, weight in WRITE_MIX.items()
+            )
+        return {name: weight for name, weight in weights.items()
+                if available[name]}
+
+    def request(self, rng, name):
+        """Случайный запрос вида name: (метод, url, данные формы)."""
+        args = {
+            'posts:group_list': self.slugs,
+            'posts:profile': self.usernames,
+            'posts:post_detail': self.post_ids,
+            'posts:add_comment': self.post_ids,
+            'posts:profile_follow': self.usernames,
+            'posts:profile_unfollow': self.usernames,
+        }.get(name)
+        url = reverse(name, args=(rng.choice(args),) if args else ())
+        if name in ('posts:post_create', 'posts:add_comment'):
+            return 'post', url, {'text': f'Нагрузка {rng.random()}'}
+        if name in MIX and name != 'posts:post_detail' and (
+            rng.random() < DEEP_PAGE_SHARE
+        ):
+            url += f'?page={rng.randint(2, DEEP_PAGES)}'
+        return 'get', url, None
+
+
+class LocalClient:
+    """Запросы к приложению в том же процессе."""
+
+    def __init__(self, reader):
+        self.client = Client()
+        if reader:
+            self.client.force_login(User.objects.get(username=reader))
+
+    def request(self, method, url, data=None):
+        return getattr(self.client, method)(url, data).status_code
+
+    def close(self):
+        connections.close_all()
+
+
+class HttpClient:
+    """Запросы к запущенному серверу; reader входит через форму логина."""
+
+    def __init__(self, base_url, reader, password):
+        self.base_url = base_url.rstrip('/')
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies)
+        )
+        if reader:
+            self.login(reader, password)
+
+    def login(self, username, password):
+        url = reverse(settings.LOGIN_URL)
+        self.request('get', url)
+        self.request('post', url, {
+            'username': username, 'password': password,
+        })
+
+    def request(self, method, url, data=None):
+        url = self.base_url + url
+        if method == 'post':
+            token = next((
+                cookie.value for cookie in self.cookies
+                if cookie.name == settings.CSRF_COOKIE_NAME
+            ), '')
+            data = urllib.parse.urlencode(
+                dict(data, csrfmiddlewaretoken=token)
+            ).encode()
+        request = urllib.request.Request(url, data, headers={'Referer': url})
+        try:
+            with self.opener.open(request) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as error:
+            return error.code
+
+    def close(self):
+        pass
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class Result:
+    """Задержки (в секундах) и ошибки по видам страниц."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.elapsed = 0.0
+
+    def add(self, samples):
+        for name, latency, status in samples:
+            self.latencies.setdefault(name, []).append(latency)
+            if status is None or status >= 400:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    @property
+    def total(self):
+        return sum(map(len, self.latencies.values()))
+
+    @property
+    def rps(self):
+        return self.total / self.elapsed if self.elapsed else 0.0
+
+    def rows(self):
+        """Строки отчёта: (вид, запросов, ошибок, p50, p95, p99) в мс."""
+        everything = [
+            value for values in self.latencies.values() for value in values
+        ]
+        for name, values in sorted(self.latencies.items()) + [
+            ('total', everything)
+        ]:
+            errors = (sum(self.errors.values()) if name == 'total'
+                      else self.errors.get(name, 0))
+            yield (name, len(values), errors) + tuple(
+                percentile(values, p) * 1000 for p in PERCENTILES
+            )
+
+
+def run(make_client, targets, clients, requests, warmup=0, seed=0,
+        write_share=0.0):
+    """Выполняет requests запросов из смеси силами clients клиентов."""
+    mix = targets.mix(write_share)
+    names, weights = list(mix), list(mix.values())
+    result = Result()
+
+    def worker(number, count, client):
+        rng = random.Random(seed * 1000 + number)
+        samples = []
+        measured_from = time.perf_counter()
+        try:
+            for index in range(warmup + count):
+                if index == warmup:
+                    measured_from = time.perf_counter()
+                name = rng.choices(names, weights)[0]
+                method, url, data = targets.request(rng, name)
+                started = time.perf_counter()
+                try:
+                    status = client.request(method, url, data)
+                except Exception:
+                    status = None
+                if index >= warmup:
+                    samples.append(
+                        (name, time.perf_counter() - started, status)
+                    )
+        finally:
+            client.close()
+        return samples, measured_from, time.perf_counter()
+
+    shares = [
+        requests // clients + (number < requests % clients)
+        for number in range(clients)
+    ]
+    # клиенты (и вход читателя) создаются до старта, чтобы запись сессий
+    # не конкурировала с замеряемыми запросами
+    pool_clients = [make_client() for _ in range(clients)]
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        batches = list(pool.map(worker, range(clients), shares, pool_clients))
+    # прогрев не входит в замеряемое окно
+    result.elapsed = (
+        max(finished for _, _, finished in batches)
+        - min(started for _, started, _ in batches)
+    )
+    for samples, _, _ in batches:
+        result.add(samples)
+    return result
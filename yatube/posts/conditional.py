@@ -0,0 +1,86 @@
+"""ETag страниц лент и поста для условных GET.
+
+ETag собирается из поколений кэша лент (см. generations), которые
+сигналы сдвигают при любом изменении, видимом на странице, и из id
+пользователя: шапка и кнопки зависят от того, кто смотрит. Поколения
+читаются из кэша, поэтому при совпадении ETag ответ 304 отдаётся без
+запроса ленты и рендеринга шаблонов. Если объекта нет, ETag не
+считается и 404 отдаёт сама вьюха. Страницы вошедших пользователей
+содержат CSRF-токен, который меняется при входе, поэтому в их ETag
+входит и хэш секрета CSRF.
+"""
+from hashlib import md5
+
+from django.middleware.csrf import get_token
+
+from . import generations
+from .models import Follow, Group, Post, User, UserStats
+
+
+def _etag(request, *parts):
+    user = request.user
+    if not user.is_authenticated:
+        return '-'.join(map(str, parts + (0,)))
+    # get_token каждый раз маскирует токен заново, стабилен только секрет
+    get_token(request)
+    secret = md5(request.META['CSRF_COOKIE'].encode()).hexdigest()[:12]
+    return '-'.join(map(str, parts + (user.pk, secret)))
+
+
+def group_for(request, slug):
+    """Группа по slug или None; ищется один раз на запрос для ETag и
+    вьюхи."""
+    if not hasattr(request, '_group'):
+        request._group = Group.objects.filter(slug=slug).first()
+    return request._group
+
+
+def index_etag(request):
+    return _etag(request, generations.index_generation())
+
+
+def following_for(request, author_id):
+    """Подписан ли зритель на автора; проверяется один раз на запрос для
+    ETag и вьюхи."""
+    if not hasattr(request, '_following'):
+        user = request.user
+        request._following = (
+            user.is_authenticated
+            and user.pk != author_id
+            and Follow.objects.filter(user=user, author_id=author_id).exists()
+        )
+    return request._following
+
+
+def group_etag(request, slug):
+    group = group_for(request, slug)
+    if group is None:
+        return None
+    return _etag(request, generations.group_generation(group))
+
+
+def profile_etag(request, username):
+    stats = UserStats.objects.filter(user__username=username).values_list(
+        'user_id', 'posts_count', 'followers_count', 'following_count'
+    ).first()
+    if stats is None:
+        return None
+    author_id, *counts = stats
+    # кнопка подписки зависит от подписки самого зрителя: по числу
+    # подписчиков её не отличить от чужой подписки и отписки
+    return _etag(
+        request,
+        generations.author_generation(User(pk=author_id)),
+        *counts, int(following_for(request, author_id))
+    )
+
+
+def post_etag(request, post_id):
+    # правка поста, комментарии к нему и новые посты автора (их число
+    # видно на странице) сдвигают поколение автора
+    author_id = Post.objects.filter(pk=post_id).values_list(
+        'author_id', flat=True
+    ).first()
+    if author_id is None:
+        return None
+    return _etag(request, generations.author_generation(User(pk=author_id)))
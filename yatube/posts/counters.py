@@ -0,0 +1,83 @@
+"""Поддержка денормализованных счётчиков постов, комментариев и подписок."""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _shift(queryset, field, delta):
+    if delta < 0:
+        # разошедшийся счётчик не уводим ниже нуля, его починит recount
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def shift_user(user_id, field, delta):
+    """Сдвигает счётчик пользователя, при увеличении создавая строку
+    статистики, если её ещё нет."""
+    if _shift(UserStats.objects.filter(user_id=user_id), field, delta):
+        return
+    if delta > 0:
+        UserStats.objects.get_or_create(user_id=user_id)
+        _shift(UserStats.objects.filter(user_id=user_id), field, delta)
+
+
+def shift_group(group_id, delta):
+    if group_id is not None:
+        _shift(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def shift_post(post_id, delta):
+    _shift(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def stats_for(user):
+    """Статистика пользователя только для чтения.
+
+    Если строки ещё нет, возвращается несохранённая статистика с точными
+    числами: запись при просмотре закрепила бы запрос за основной базой.
+    Строку создают сигнал post_save пользователя и recount.
+    """
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return UserStats(
+            user=user,
+            posts_count=Post.objects.filter(author=user).count(),
+            followers_count=Follow.objects.filter(author=user).count(),
+            following_count=Follow.objects.filter(user=user).count(),
+        )
+
+
+def create_stats(user):
+    """Заводит строку статистики нового пользователя одним запросом."""
+    UserStats.objects.bulk_create(
+        [UserStats(user=user)], ignore_conflicts=True
+    )
+
+
+def _count(model, fk):
+    """Подзапрос числа строк model, ссылающихся через fk на внешний pk
+    (у UserStats pk совпадает с id пользователя)."""
+    rows = model.objects.filter(
+        **{fk: OuterRef('pk')}
+    ).order_by().values(fk).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(rows), 0)
+
+
+def recount():
+    """Пересчитывает все счётчики по фактическим данным."""
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk) for pk in missing.iterator()),
+        ignore_conflicts=True
+    )
+    UserStats.objects.update(
+        posts_count=_count(Post, 'author'),
+        followers_count=_count(Follow, 'author'),
+        following_count=_count(Follow, 'user'),
+    )
+    Group.objects.update(posts_count=_count(Post, 'group'))
+    Post.objects.update(comments_count=_count(Comment, 'post'))
@@ -0,0 +1,75 @@
+"""Области кэша лент и их поколения.
+
+Фрагменты главной, страницы группы и профиля кэшируются надолго с
+поколением соответствующей области в качестве версии. Сигналы начинают
+новое поколение при любом изменении, видимом в ленте. Теми же
+областями помечены страницы в кэше для анонимов (core.pagecache), и
+смена поколения удаляет их; страницы поста и счётчики пользователя
+сбрасываются по своим областям. У каждого поста своё поколение для
+кэша его разметки в лентах (templatetags.post_articles).
+"""
+from core import pagecache
+from core.cache import bump_generation, get_generation, get_generations
+
+INDEX = 'feed:index'
+GROUPS = 'feed:groups'
+
+
+def group_scope(group_id):
+    return f'feed:group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'feed:author:{author_id}'
+
+
+def post_scope(post_id):
+    return f'page:post:{post_id}'
+
+
+def stats_scope(user_id):
+    return f'page:stats:{user_id}'
+
+
+def article_scope(post_id):
+    return f'article:{post_id}'
+
+
+def index_generation():
+    return get_generation(INDEX, GROUPS)
+
+
+def group_generation(group):
+    return get_generation(group_scope(group.pk), GROUPS)
+
+
+def author_generation(author):
+    return get_generation(author_scope(author.pk), GROUPS)
+
+
+def article_generations(post_ids):
+    """Версии разметки постов: {id поста: поколение}."""
+    scopes = {pk: article_scope(pk) for pk in post_ids}
+    found = get_generations([*scopes.values(), GROUPS])
+    return {
+        pk: f'{found[scope]}.{found[GROUPS]}' for pk, scope in scopes.items()
+    }
+
+
+def bump_articles(*post_ids):
+    """Текст, картинка или число комментариев поста изменились."""
+    bump_generation(*map(article_scope, post_ids))
+
+
+def bump_post(author_id, *group_ids):
+    """Инвалидирует ленты, в которых виден пост."""
+    scopes = [INDEX, author_scope(author_id)]
+    scopes += [group_scope(pk) for pk in set(group_ids) if pk is not None]
+    bump_generation(*scopes)
+    pagecache.invalidate(*scopes)
+
+
+def bump_groups():
+    """Название или slug группы видны во всех лентах."""
+    bump_generation(GROUPS)
+    pagecache.clear()
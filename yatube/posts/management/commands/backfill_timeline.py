@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные ленты подписок (TimelineEntry).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='id пользователя; можно указать несколько раз'
+        )
+
+    def handle(self, *args, **options):
+        timeline.rebuild(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS('Ленты подписок пересобраны.'))
@@ -0,0 +1,101 @@
+import logging
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+
+from core.db import DEFAULT_PRAGMAS
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = ('Прогоняет смесь запросов к index, group_posts, profile, '
+            'post_detail и follow_index от нескольких клиентов и выводит '
+            'p50/p95/p99 и запросы в секунду.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=8)
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument(
+            '--warmup', type=int, default=10,
+            help='незамеряемые запросы каждого клиента перед прогоном'
+        )
+        parser.add_argument(
+            '--base-url',
+            help='адрес запущенного сервера; без него запросы идут '
+                 'в приложение в этом же процессе'
+        )
+        parser.add_argument(
+            '--password',
+            help='пароль читателя ленты подписок для --base-url (его '
+                 'выводит seed_data)'
+        )
+        parser.add_argument(
+            '--write-share', type=float, default=0.0,
+            help='доля запросов-записей: посты, комментарии, подписки'
+        )
+        parser.add_argument(
+            '--sqlite-pragmas', choices=('settings', 'default'),
+            default='settings',
+            help='default - прогон с PRAGMA SQLite по умолчанию (журнал '
+                 'отката) для сравнения с SQLITE_PRAGMAS'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['requests'] < 1:
+            raise CommandError('Нужен хотя бы один клиент и один запрос.')
+        if options['base_url'] and not options['password']:
+            raise CommandError('С --base-url нужен --password читателя.')
+        if options['sqlite_pragmas'] == 'default':
+            if options['base_url']:
+                raise CommandError(
+                    'PRAGMA сервера задаются его настройками, '
+                    '--sqlite-pragmas работает только без --base-url.'
+                )
+            # новые подключения получат PRAGMA по умолчанию; журнал
+            # базы переключается обратно из WAL первым же подключением
+            connections.close_all()
+            with override_settings(SQLITE_PRAGMAS=DEFAULT_PRAGMAS):
+                self.run(options)
+            connections.close_all()
+            return
+        self.run(options)
+
+    def run(self, options):
+        targets = benchmark.Targets.from_db()
+        if options['base_url']:
+            def make_client():
+                return benchmark.HttpClient(
+                    options['base_url'], targets.reader, options['password']
+                )
+        else:
+            def make_client():
+                return benchmark.LocalClient(targets.reader)
+        # построчный лог замеров каждого запроса заглушил бы отчёт
+        performance_log = logging.getLogger('yatube.performance')
+        level = performance_log.level
+        performance_log.setLevel(logging.WARNING)
+        try:
+            result = benchmark.run(
+                make_client, targets,
+                clients=options['clients'],
+                requests=options['requests'],
+                warmup=options['warmup'],
+                seed=options['seed'],
+                write_share=options['write_share'],
+            )
+        finally:
+            performance_log.setLevel(level)
+        header = ('view', 'requests', 'errors', 'p50 ms', 'p95 ms', 'p99 ms')
+        self.stdout.write('{:<24}{:>10}{:>8}{:>10}{:>10}{:>10}'.format(
+            *header
+        ))
+        for row in result.rows():
+            self.stdout.write(
+                '{:<24}{:>10}{:>8}{:>10.1f}{:>10.1f}{:>10.1f}'.format(*row)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.total} запросов за {result.elapsed:.2f} с: '
+            f'{result.rps:.1f} запросов/с.'
+        ))
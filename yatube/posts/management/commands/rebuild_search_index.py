@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import search
+
+
+class Command(BaseCommand):
+    help = 'Строит поисковый индекс по текстам всех постов заново.'
+
+    def handle(self, *args, **options):
+        search.rebuild()
+        backend = 'FTS5' if search.fts_available() else 'SearchTerm'
+        self.stdout.write(
+            self.style.SUCCESS(f'Поисковый индекс ({backend}) перестроен.')
+        )
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from posts.markup import rerender
+from posts.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = ('Строит HTML-разметку текстов постов и комментариев '
+            '(например, после вставки в обход save()).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing', action='store_true',
+            help='Только строки, у которых разметки ещё нет.'
+        )
+
+    def handle(self, *args, **options):
+        for model in (Post, Comment):
+            changed = rerender(model, only_missing=options['missing'])
+            self.stdout.write(self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: {changed} обновлено.'
+            ))
@@ -0,0 +1,77 @@
+import secrets
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import seeding
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = ('Наполняет базу синтетическими пользователями, группами, '
+            'постами, комментариями и подписками для нагрузочных тестов. '
+            'Без --password пароль пользователей генерируется и выводится '
+            'один раз.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=50000)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument(
+            '--images', type=int, default=20,
+            help='число разных картинок, которые получат посты'
+        )
+        parser.add_argument(
+            '--image-ratio', type=float, default=0.5,
+            help='доля постов с картинкой'
+        )
+        parser.add_argument(
+            '--prefix', default='seed_',
+            help='префикс имён пользователей, slug групп и файлов'
+        )
+        parser.add_argument(
+            '--password',
+            help='пароль всех пользователей; по умолчанию случайный'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--force', action='store_true',
+            help='наполнить базу и при выключенном DEBUG'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options['force']:
+            raise CommandError(
+                'DEBUG выключен: похоже на рабочую базу. '
+                'Чтобы наполнить её всё равно, добавьте --force.'
+            )
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=prefix).exists():
+            raise CommandError(
+                f'Пользователи с префиксом {prefix!r} уже есть, '
+                'укажите другой --prefix.'
+            )
+        password = options['password'] or secrets.token_urlsafe()
+        created = seeding.seed(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows=options['follows'],
+            password=password,
+            images=options['images'],
+            image_ratio=options['image_ratio'],
+            prefix=prefix,
+            batch_size=options['batch_size'],
+            random_seed=options['seed'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Создано: ' + ', '.join(
+                f'{name} - {count}' for name, count in created.items()
+            ) + '.'
+        ))
+        if not options['password']:
+            self.stdout.write(f'Пароль пользователей: {password}')
@@ -0,0 +1,35 @@
+"""Готовая HTML-разметка текстов постов и комментариев.
+
+Разметка строится при сохранении и хранится в text_html, поэтому
+шаблоны не экранируют и не переносят строки при каждой отрисовке.
+Строки, вставленные в обход save() (bulk_create, update), дополняет
+команда render_texts.
+"""
+from django.template.defaultfilters import linebreaksbr
+
+BATCH_SIZE = 500
+
+
+def render_text(text):
+    """То же, что {{ text|linebreaksbr }}: экранирование и <br>."""
+    return linebreaksbr(text, autoescape=True)
+
+
+def rerender(model, only_missing=False, batch_size=BATCH_SIZE):
+    """Перестраивает text_html у строк model и возвращает их число."""
+    rows = model.objects.only('pk', 'text').order_by('pk')
+    if only_missing:
+        rows = rows.filter(text_html='')
+    changed = 0
+    batch = []
+    for obj in rows.iterator(chunk_size=batch_size):
+        obj.text_html = render_text(obj.text)
+        batch.append(obj)
+        if len(batch) == batch_size:
+            changed += len(batch)
+            model.objects.bulk_update(batch, ['text_html'])
+            batch = []
+    if batch:
+        changed += len(batch)
+        model.objects.bulk_update(batch, ['text_html'])
+    return changed
@@ -0,0 +1,17 @@
+"""Метрики приложения posts; регистрируются в core.metrics.REGISTRY."""
+from core.metrics import Counter, Histogram
+
+POSTS_CREATED = Counter(
+    'yatube_posts_created_total', 'Созданные посты.'
+)
+COMMENTS_CREATED = Counter(
+    'yatube_comments_created_total', 'Созданные комментарии.'
+)
+FOLLOWS = Counter(
+    'yatube_follows_total', 'Подписки и отписки.', ('action',)
+)
+THUMBNAIL_SECONDS = Histogram(
+    'yatube_thumbnail_generation_seconds',
+    'Время построения всех миниатюр одного изображения.',
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
@@ -0,0 +1,82 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:50
+
+import django.db.models.deletion
+from django.db import DatabaseError, migrations, models
+
+from posts.search import FTS_TABLE, tokenize
+
+BATCH_SIZE = 1000
+
+
+def create_fts(apps, schema_editor):
+    """Таблица FTS5 для поиска; без поддержки FTS5 поиск работает
+    через SearchTerm."""
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute('SAVEPOINT create_fts')
+            cursor.execute(
+                'CREATE VIRTUAL TABLE posts_post_fts USING fts5(terms)'
+            )
+            cursor.execute('RELEASE SAVEPOINT create_fts')
+    except DatabaseError:
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute('ROLLBACK TO SAVEPOINT create_fts')
+
+
+def fill_index(apps, schema_editor):
+    """Индексирует посты, написанные до появления поиска."""
+    connection = schema_editor.connection
+    Post = apps.get_model('posts', 'Post')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    posts = Post.objects.using(connection.alias).values_list(
+        'pk', 'text'
+    ).iterator()
+    if FTS_TABLE in connection.introspection.table_names():
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, terms) VALUES (%s, %s)',
+                ((pk, ' '.join(tokenize(text))) for pk, text in posts)
+            )
+        return
+    SearchTerm.objects.using(connection.alias).bulk_create(
+        (
+            SearchTerm(term=term, post_id=pk)
+            for pk, text in posts for term in set(tokenize(text))
+        ),
+        batch_size=BATCH_SIZE
+    )
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_auto_20261018_1041'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Терм')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Терм поиска',
+                'verbose_name_plural': 'Термы поиска',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term'),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+        migrations.RunPython(fill_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:17
+
+from django.db import migrations, models
+from django.template.defaultfilters import linebreaksbr
+
+
+def forwards_func(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    for name in ('Post', 'Comment'):
+        model = apps.get_model('posts', name)
+        rows = model.objects.using(db_alias).only('pk', 'text')
+        batch = []
+        for obj in rows.iterator(chunk_size=500):
+            obj.text_html = linebreaksbr(obj.text, autoescape=True)
+            batch.append(obj)
+        model.objects.using(db_alias).bulk_update(
+            batch, ['text_html'], batch_size=500
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_auto_20261018_1050'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Текст в HTML'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='Текст в HTML'),
+        ),
+        migrations.RunPython(forwards_func, migrations.RunPython.noop),
+    ]
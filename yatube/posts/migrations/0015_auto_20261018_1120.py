@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 04:20
+
+from django.db import migrations, models
+from django.db.models import CharField, Value
+from django.db.models.functions import Cast, Concat, LPad
+import django.db.models.deletion
+
+
+def forwards_func(apps, schema_editor):
+    # до веток все комментарии были верхнего уровня: путь - свой id
+    Comment = apps.get_model('posts', 'Comment')
+    Comment.objects.using(schema_editor.connection.alias).update(
+        path=Concat(
+            LPad(Cast('pk', CharField()), 10, Value('0')), Value('/')
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_auto_20261018_1117'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='parent',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='replies', to='posts.Comment', verbose_name='Ответ на'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='Путь в ветке'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'path'], name='comment_post_path_idx'),
+        ),
+        migrations.RunPython(forwards_func, migrations.RunPython.noop),
+    ]
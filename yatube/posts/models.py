@@ -1,16 +1,76 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.db import models
 from django.db.models import F, Q
+from django.utils.safestring import mark_safe
 
+from .markup import render_text
 
 User = get_user_model()
 
+PATH_SEP = '/'
+PATH_DIGITS = 10
+
+# посты, удаляемые сейчас: их отмечают сигналы удаления (posts.signals),
+# чтобы каскад не пересчитывал пост на каждый его комментарий
+deleting_posts = ContextVar('deleting_posts', default=frozenset())
+
+
+def path_segment(pk):
+    """Звено пути комментария: id с нулями, чтобы строки сортировались
+    как числа."""
+    return f'{pk:0{PATH_DIGITS}d}{PATH_SEP}'
+
+
+@contextmanager
+def keep_deleting_posts():
+    """Возвращает отметки удаляемых постов к прежним, даже если удаление
+    упало между pre_delete и post_delete."""
+    token = deleting_posts.set(deleting_posts.get())
+    try:
+        yield
+    finally:
+        deleting_posts.reset(token)
+
+
+class RenderedText(models.Model):
+    """Текст с заранее построенной HTML-разметкой (см. posts.markup)."""
+    text_html = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name='Текст в HTML'
+    )
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self.text_html = render_text(self.text)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'text' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'text_html'}
+        super().save(*args, **kwargs)
+
+    @property
+    def rendered_text(self):
+        # строки из bulk_create ещё без разметки
+        if self.text_html or not self.text:
+            return mark_safe(self.text_html)
+        return render_text(self.text)
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, db_index=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Постов в группе'
+    )
 
     def __str__(self):
         return self.title
@@ -20,7 +80,13 @@ class Group(models.Model):
         verbose_name_plural = 'Группы'
 
 
-class Post(models.Model):
+class PostQuerySet(models.QuerySet):
+    def delete(self):
+        with keep_deleting_posts():
+            return super().delete()
+
+
+class Post(RenderedText):
     group = models.ForeignKey(
         Group,
         blank=True,
@@ -50,18 +116,40 @@ class Post(models.Model):
         blank=True,
         help_text='Картинка'
     )
+    comments_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Комментариев'
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         get_latest_by = ['pub_date']
+        indexes = [
+            models.Index(fields=['-pub_date'], name='post_pub_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.DISP_LETTERS]
 
+    def delete(self, *args, **kwargs):
+        with keep_deleting_posts():
+            return super().delete(*args, **kwargs)
+
 
-class Comment(models.Model):
+class Comment(RenderedText):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -82,16 +170,62 @@ class Comment(models.Model):
         auto_now_add=True,
         verbose_name='Дата создания'
     )
+    parent = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='replies',
+        verbose_name='Ответ на'
+    )
+    # материализованный путь: id предков и свой id (см. posts.threads)
+    path = models.CharField(
+        max_length=255,
+        blank=True,
+        editable=False,
+        verbose_name='Путь в ветке'
+    )
 
     class Meta:
         ordering = ['created']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         get_latest_by = ['created']
+        indexes = [
+            models.Index(
+                fields=['post', 'created'],
+                name='comment_post_created_idx'
+            ),
+            models.Index(
+                fields=['post', 'path'],
+                name='comment_post_path_idx'
+            ),
+        ]
 
     def __str__(self):
         return self.text[:settings.DISP_LETTERS]
 
+    @property
+    def depth(self):
+        return max(self.path.count(PATH_SEP) - 1, 0)
+
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        if adding and self.parent_id:
+            # ответ глубже предела становится ответом на родителя выше,
+            # но не выше корня ветки
+            while self.parent.parent_id and (
+                self.parent.depth >= settings.COMMENT_MAX_DEPTH
+            ):
+                self.parent = self.parent.parent
+        super().save(*args, **kwargs)
+        if adding and not self.path:
+            prefix = ''
+            if self.parent_id:
+                prefix = self.parent.path or path_segment(self.parent_id)
+            self.path = prefix + path_segment(self.pk)
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -109,6 +243,12 @@ class Follow(models.Model):
 
     class Meta:
         verbose_name = 'Подписки'
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'author'],
@@ -119,3 +259,88 @@ class Follow(models.Model):
                 name="user isn't an author"
             )
         ]
+
+
+class SearchTerm(models.Model):
+    """Инвертированный индекс для поиска, если нет SQLite FTS5."""
+    term = models.CharField(max_length=64, verbose_name='Терм')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Пост'
+    )
+
+    class Meta:
+        verbose_name = 'Терм поиска'
+        verbose_name_plural = 'Термы поиска'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'],
+                name='unique_search_term'
+            ),
+        ]
+
+    def __str__(self):
+        return self.term
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0, verbose_name='Постов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0, verbose_name='Подписчиков'
+    )
+    following_count = models.PositiveIntegerField(
+        default=0, verbose_name='Подписок'
+    )
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+    def __str__(self):
+        return str(self.user)
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: пост автора у каждого подписчика."""
+    user = models.ForeignKey(
+        User,
+        verbose_name='Подписчик',
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        verbose_name='Пост',
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    pub_date = models.DateTimeField(verbose_name='Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date']
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_pub_date_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            ),
+        ]
@@ -0,0 +1,143 @@
+"""Полнотекстовый поиск по тексту постов.
+
+Текст разбивается на термы: слова в нижнем регистре, ё заменяется на е,
+стоп-слова выбрасываются, от русских слов отрезаются окончания. Термы
+хранятся в инвертированном индексе: в таблице SQLite FTS5, если она
+доступна, иначе - в модели SearchTerm. Индекс обновляется сигналами при
+создании, правке и удалении поста.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Count
+from django.db.models.expressions import RawSQL
+
+from .models import Post, SearchTerm
+
+FTS_TABLE = 'posts_post_fts'
+MIN_STEM = 3
+MAX_TERM = 64
+WORD_RE = re.compile(r'\w+')
+STOP_WORDS = frozenset((
+    'а', 'без', 'бы', 'был', 'была', 'были', 'было', 'быть', 'в', 'вам',
+    'вас', 'во', 'вот', 'все', 'всё', 'вы', 'да', 'для', 'до', 'его',
+    'ее', 'её', 'ей', 'ему', 'если', 'есть', 'еще', 'ещё', 'же', 'за',
+    'и', 'из', 'или', 'им', 'их', 'к', 'как', 'ко', 'когда', 'кто',
+    'ли', 'мне', 'мы', 'на', 'над', 'не', 'нет', 'ни', 'но', 'ну', 'о',
+    'об', 'он', 'она', 'они', 'оно', 'от', 'по', 'под', 'при', 'с', 'со',
+    'так', 'там', 'то', 'тот', 'ты', 'у', 'уже', 'что', 'чтобы', 'это',
+    'я',
+))
+REFLEXIVE = ('ся', 'сь')
+# окончания прилагательных, причастий, существительных и глаголов;
+# проверяются от длинных к коротким
+ENDINGS = tuple(sorted((
+    'ыми', 'ими', 'ого', 'его', 'ому', 'ему', 'ая', 'яя', 'ое', 'ее',
+    'ие', 'ые', 'ий', 'ый', 'ой', 'ей', 'ую', 'юю', 'ых', 'их', 'ым',
+    'им', 'ом', 'ем', 'ами', 'ями', 'ах', 'ях', 'ов', 'ев', 'ам', 'ям',
+    'ию', 'ия', 'ья', 'ье', 'ью', 'иями', 'иях', 'ать', 'ять', 'ить',
+    'еть', 'уть', 'ешь', 'ете', 'ает', 'яет', 'ают', 'яют', 'ет', 'ут',
+    'ют', 'ит', 'ат', 'ят',
+    'ила', 'ело', 'ала', 'али', 'или', 'ишь', 'ите', 'а', 'я', 'о', 'е',
+    'ы', 'и', 'у', 'ю', 'ь', 'й',
+), key=len, reverse=True))
+
+
+def stem(word):
+    """Отрезает самое длинное окончание, оставляя основу не короче
+    MIN_STEM букв."""
+    for ending in REFLEXIVE:
+        if word.endswith(ending) and len(word) - 2 > MIN_STEM:
+            word = word[:-2]
+            break
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    """Список термов текста в порядке появления."""
+    words = WORD_RE.findall(text.lower().replace('ё', 'е'))
+    return [
+        stem(word)[:MAX_TERM] for word in words
+        if word not in STOP_WORDS and len(word) > 1
+    ]
+
+
+_fts = {}
+
+
+def fts_available():
+    """Есть ли в текущей базе таблица FTS5 (создаётся миграцией)."""
+    name = connection.settings_dict['NAME']
+    if name not in _fts:
+        _fts[name] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts[name]
+
+
+def index_post(post):
+    """Переиндексирует текст поста."""
+    terms = tokenize(post.text)
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+            )
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, terms) VALUES (%s, %s)',
+                [post.pk, ' '.join(terms)]
+            )
+        return
+    SearchTerm.objects.filter(post_id=post.pk).delete()
+    SearchTerm.objects.bulk_create(
+        SearchTerm(term=term, post_id=post.pk) for term in set(terms)
+    )
+
+
+def unindex_post(post_id):
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+    # строки SearchTerm удаляются каскадно вместе с постом
+
+
+def rebuild():
+    """Строит индекс заново по всем постам."""
+    if fts_available():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    else:
+        SearchTerm.objects.all().delete()
+    for post in Post.objects.only('pk', 'text').iterator():
+        index_post(post)
+
+
+class _RawSubquery(RawSQL):
+    """Подзапрос для __in: RawSQL берёт SQL в скобки, lookup добавляет
+    свои, и SQLite считает IN ((SELECT ...)) скалярным подзапросом."""
+
+    def as_sql(self, compiler, connection):
+        return self.sql, self.params
+
+
+def search_posts(queryset, query):
+    """Посты queryset, содержащие все термы запроса."""
+    terms = set(tokenize(query))
+    if not terms:
+        return queryset.none()
+    if fts_available():
+        match = ' '.join(f'"{term}"' for term in sorted(terms))
+        return queryset.filter(pk__in=_RawSubquery(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match]
+        ))
+    matching = SearchTerm.objects.filter(term__in=terms).values(
+        'post'
+    ).annotate(found=Count('term')).filter(found=len(terms)).values('post')
+    return queryset.filter(pk__in=matching)
@@ -0,0 +1,167 @@
+"""Наполнение базы синтетическими данными для нагрузочных тестов.
+
+Все строки вставляются через bulk_create пачками, поэтому сигналы не
+срабатывают: после вставки счётчики, ленты подписок и поисковый индекс
+пересобираются целиком, а кэш лент сбрасывается новым поколением.
+HTML-разметка текстов строится сразу при создании строк. В конце
+обновляется статистика базы, по которой пагинаторы оценивают размер
+таблиц.
+"""
+import io
+import random
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+
+from core.db import analyze
+
+from . import counters, generations, search, threads, timeline
+from .markup import render_text
+from .models import Comment, Follow, Group, Post, User
+
+WORDS = (
+    'кот', 'собака', 'город', 'река', 'утро', 'вечер', 'дорога', 'книга',
+    'музыка', 'лето', 'зима', 'море', 'горы', 'друзья', 'работа', 'отпуск',
+    'новости', 'погода', 'кофе', 'поезд', 'фотография', 'прогулка',
+)
+IMAGE_SIZE = (1200, 800)
+PERIOD = timedelta(days=365)
+
+
+def batches(objects, size):
+    iterator = iter(objects)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def bulk_insert(model, objects, batch_size):
+    # внутри пачки bulk_create сам делит вставку под лимиты SQLite
+    for batch in batches(objects, batch_size):
+        model.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+@contextmanager
+def explicit_dates(*fields):
+    """Временно отключает auto_now_add, чтобы вставить свои даты."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def make_images(rng, count, prefix):
+    """Сохраняет count однотонных JPEG и возвращает их имена."""
+    names = []
+    for i in range(count):
+        buffer = io.BytesIO()
+        color = tuple(rng.randrange(256) for _ in range(3))
+        Image.new('RGB', IMAGE_SIZE, color).save(buffer, 'JPEG')
+        names.append(default_storage.save(
+            f'posts/{prefix}{i}.jpg', ContentFile(buffer.getvalue())
+        ))
+    return names
+
+
+def seed(users, groups, posts, comments, follows, password, images=20,
+         image_ratio=0.5, prefix='seed_', batch_size=1000, random_seed=0):
+    """Создаёт данные и возвращает число созданных строк по моделям.
+    У всех пользователей пароль password."""
+    rng = random.Random(random_seed)
+    now = timezone.now()
+    password = make_password(password)
+    image_names = make_images(rng, images, prefix) if images else []
+
+    with transaction.atomic():
+        bulk_insert(User, (
+            User(username=f'{prefix}{i}', password=password)
+            for i in range(users)
+        ), batch_size)
+        user_ids = list(User.objects.filter(
+            username__startswith=prefix
+        ).values_list('pk', flat=True))
+        bulk_insert(Group, (
+            Group(
+                title=f'Группа {prefix}{i}', slug=f'{prefix}group-{i}',
+                description=text(rng, 12)
+            ) for i in range(groups)
+        ), batch_size)
+        group_ids = list(Group.objects.filter(
+            slug__startswith=f'{prefix}group-'
+        ).values_list('pk', flat=True)) or [None]
+
+        def post():
+            image = ''
+            if image_names and rng.random() < image_ratio:
+                image = rng.choice(image_names)
+            body = text(rng, rng.randint(5, 60))
+            return Post(
+                author_id=rng.choice(user_ids),
+                group_id=rng.choice(group_ids + [None]),
+                text=body,
+                text_html=render_text(body),
+                pub_date=now - PERIOD * rng.random(),
+                image=image,
+            )
+
+        def comment(post_id, pub_date):
+            body = text(rng, rng.randint(3, 20))
+            return Comment(
+                post_id=post_id,
+                author_id=rng.choice(user_ids),
+                text=body,
+                text_html=render_text(body),
+                created=min(pub_date + PERIOD * rng.random() / 12, now),
+            )
+
+        post_date = Post._meta.get_field('pub_date')
+        comment_date = Comment._meta.get_field('created')
+        with explicit_dates(post_date, comment_date):
+            bulk_insert(Post, (post() for _ in range(posts)), batch_size)
+            post_dates = list(Post.objects.filter(
+                author_id__in=user_ids
+            ).values_list('pk', 'pub_date'))
+            bulk_insert(Comment, (
+                comment(*rng.choice(post_dates)) for _ in range(comments)
+            ) if post_dates else (), batch_size)
+
+        pairs = set()
+        limit = min(follows, len(user_ids) * (len(user_ids) - 1))
+        while len(pairs) < limit:
+            user_id, author_id = rng.sample(user_ids, 2)
+            pairs.add((user_id, author_id))
+        bulk_insert(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs
+        ), batch_size)
+
+        threads.fill_paths()
+        counters.recount()
+        timeline.rebuild(user_ids)
+        search.rebuild()
+    analyze()
+    generations.bump_groups()
+    return {
+        'users': len(user_ids),
+        'groups': len(group_ids) if group_ids != [None] else 0,
+        'posts': len(post_dates),
+        'comments': comments if post_dates else 0,
+        'follows': len(pairs),
+        'images': len(image_names),
+    }
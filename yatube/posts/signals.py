@@ -0,0 +1,158 @@
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+
+from core import pagecache
+
+from . import counters, generations, search, thumbnails, timeline
+from .metrics import COMMENTS_CREATED, FOLLOWS, POSTS_CREATED
+from .models import Comment, Follow, Group, Post, User, deleting_posts
+
+
+@receiver(post_save, sender=User)
+def user_stats(sender, instance, created, **kwargs):
+    if created:
+        counters.create_stats(instance)
+
+
+@receiver(pre_save, sender=Post)
+def post_remember_state(sender, instance, **kwargs):
+    if instance._state.adding:
+        return
+    old = Post.objects.filter(pk=instance.pk).values(
+        'group_id', 'image', 'text'
+    ).first()
+    if old is not None:
+        instance._old_group_id = old['group_id']
+        instance._old_image = old['image']
+        instance._old_text = old['text']
+
+
+@receiver(post_save, sender=Post)
+def post_fan_out(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_search_index(sender, instance, created, **kwargs):
+    if created or instance.text != getattr(instance, '_old_text', None):
+        search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_search_unindex(sender, instance, **kwargs):
+    search.unindex_post(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def post_thumbnails(sender, instance, **kwargs):
+    image_name = instance.image.name
+    if image_name and image_name != getattr(instance, '_old_image', None):
+        thumbnails.schedule(image_name)
+
+
+@receiver(post_save, sender=Post)
+def post_counters(sender, instance, created, **kwargs):
+    if created:
+        POSTS_CREATED.inc()
+        counters.shift_user(instance.author_id, 'posts_count', 1)
+        counters.shift_group(instance.group_id, 1)
+        return
+    old_group_id = getattr(instance, '_old_group_id', instance.group_id)
+    if old_group_id != instance.group_id:
+        counters.shift_group(old_group_id, -1)
+        counters.shift_group(instance.group_id, 1)
+
+
+@receiver(post_save, sender=Post)
+def post_invalidate_feeds(sender, instance, created, **kwargs):
+    generations.bump_post(
+        instance.author_id,
+        instance.group_id,
+        getattr(instance, '_old_group_id', None)
+    )
+    scopes = [generations.post_scope(instance.pk)]
+    if created:
+        scopes.append(generations.stats_scope(instance.author_id))
+    else:
+        generations.bump_articles(instance.pk)
+    pagecache.invalidate(*scopes)
+
+
+@receiver(pre_delete, sender=Post)
+def post_mark_deleting(sender, instance, **kwargs):
+    deleting_posts.set(deleting_posts.get() | {instance.pk})
+
+
+@receiver(post_delete, sender=Post)
+def post_delete_counters(sender, instance, **kwargs):
+    deleting_posts.set(deleting_posts.get() - {instance.pk})
+    counters.shift_user(instance.author_id, 'posts_count', -1)
+    counters.shift_group(instance.group_id, -1)
+    generations.bump_post(instance.author_id, instance.group_id)
+    pagecache.invalidate(
+        generations.post_scope(instance.pk),
+        generations.stats_scope(instance.author_id)
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_invalidate_feeds(sender, instance, **kwargs):
+    generations.bump_groups()
+
+
+def comment_invalidate_feeds(comment):
+    post = Post.objects.filter(pk=comment.post_id).values(
+        'author_id', 'group_id'
+    ).first()
+    if post is not None:
+        generations.bump_post(post['author_id'], post['group_id'])
+    generations.bump_articles(comment.post_id)
+    pagecache.invalidate(generations.post_scope(comment.post_id))
+
+
+@receiver(post_save, sender=Comment)
+def comment_counters(sender, instance, created, **kwargs):
+    if created:
+        COMMENTS_CREATED.inc()
+        counters.shift_post(instance.post_id, 1)
+        comment_invalidate_feeds(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_delete_counters(sender, instance, **kwargs):
+    # сигналы каскада приходят раньше post_delete самого поста, который
+    # и сбросит его кэш
+    if instance.post_id in deleting_posts.get():
+        return
+    counters.shift_post(instance.post_id, -1)
+    comment_invalidate_feeds(instance)
+
+
+def follow_invalidate_pages(follow):
+    pagecache.invalidate(
+        generations.stats_scope(follow.author_id),
+        generations.stats_scope(follow.user_id)
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_backfill(sender, instance, created, **kwargs):
+    if created:
+        FOLLOWS.inc(action='follow')
+        timeline.add_author(instance.user_id, instance.author_id)
+        counters.shift_user(instance.author_id, 'followers_count', 1)
+        counters.shift_user(instance.user_id, 'following_count', 1)
+        follow_invalidate_pages(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def unfollow_cleanup(sender, instance, **kwargs):
+    FOLLOWS.inc(action='unfollow')
+    timeline.remove_author(instance.user_id, instance.author_id)
+    counters.shift_user(instance.author_id, 'followers_count', -1)
+    counters.shift_user(instance.user_id, 'following_count', -1)
+    follow_invalidate_pages(instance)
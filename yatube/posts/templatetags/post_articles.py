@@ -0,0 +1,69 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+
+from core.cache import _record
+from posts import generations, thumbnails
+
+register = template.Library()
+
+ARTICLE_TEMPLATE = 'posts/includes/article.html'
+ARTICLE_KEY = 'article:{}:{}'
+PREFETCHED = 'post_articles'
+
+
+def variant(context):
+    """Ветки article.html: выводятся ли автор и ссылка на группу."""
+    return '{:d}{:d}'.format(
+        not context.get('posts_owner'), not context.get('group')
+    )
+
+
+def lookup(context, posts):
+    """{id поста: (ключ, версия, разметка из кэша или None)}."""
+    versions = generations.article_generations(post.pk for post in posts)
+    keys = {
+        post.pk: ARTICLE_KEY.format(post.pk, variant(context))
+        for post in posts
+    }
+    cached = cache.get_many(keys.values())
+    found = {}
+    for pk, key in keys.items():
+        entry = cached.get(key)
+        html = entry[1] if entry and entry[0] == versions[pk] else None
+        found[pk] = (key, versions[pk], html)
+    return found
+
+
+@register.simple_tag(takes_context=True)
+def prefetch_articles(context, posts):
+    """Читает из кэша разметку всех постов страницы одним запросом, а
+    картинки загружает только для постов, которых в кэше нет."""
+    posts = list(posts)
+    found = lookup(context, posts)
+    context.render_context[PREFETCHED] = found
+    thumbnails.prefetch(
+        post.image.name for post in posts
+        if post.image and found[post.pk][2] is None
+    )
+    return ''
+
+
+@register.simple_tag(takes_context=True)
+def article(context, post):
+    """Пост по шаблону article.html.
+
+    Разметка кэшируется по id поста, варианту шаблона и поколению поста,
+    поэтому перестроенные ленты собираются из готовых фрагментов.
+    """
+    found = context.render_context.get(PREFETCHED, {})
+    if post.pk not in found:
+        found = lookup(context, [post])
+    key, version, html = found[post.pk]
+    _record('article', hit=html is not None)
+    if html is None:
+        template = context.template.engine.get_template(ARTICLE_TEMPLATE)
+        with context.push(post=post):
+            html = template.render(context)
+        cache.set(key, (version, html), settings.FEED_CACHE_TIMEOUT)
+    return html
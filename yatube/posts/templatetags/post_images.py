@@ -0,0 +1,42 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+SIZES = '(max-width: 960px) 100vw, 960px'
+DEFAULT_WIDTH = 960
+
+
+def srcset(found):
+    return ', '.join(f'{url} {width}w' for width, url in found)
+
+
+@register.inclusion_tag('posts/includes/picture.html')
+def responsive_image(image, css_class='card-img my-2'):
+    """Разметка <picture> с srcset из заранее построенных вариантов.
+
+    Недостающие варианты не строятся во время рендера, а ставятся в
+    очередь; пока их нет, показывается исходная картинка.
+    """
+    if not image:
+        return {'image': None}
+    found = thumbnails.variants(image.name)
+    if sum(map(len, found.values())) < len(thumbnails.THUMBNAILS):
+        thumbnails.ensure(image.name)
+    jpeg = found.pop('JPEG', [])
+    src = dict(jpeg).get(DEFAULT_WIDTH) or (
+        jpeg[-1][1] if jpeg else image.url
+    )
+    sources = [
+        {'type': thumbnails.MIME_TYPES[fmt], 'srcset': srcset(urls)}
+        for fmt, urls in found.items()
+    ]
+    return {
+        'image': image,
+        'css_class': css_class,
+        'sources': sources,
+        'src': src,
+        'srcset': srcset(jpeg),
+        'sizes': SIZES,
+    }
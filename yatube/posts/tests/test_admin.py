@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.db import analyze
+from core.testing import query_budget
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(ESTIMATED_COUNT_THRESHOLD=0)
+class ChangeListTest(TestCase):
+    """Стоимость списков изменений не зависит от размера таблиц.
+
+    Строк меньше страницы списка, поэтому второй замер после вставки
+    новых пользователей, групп, постов и комментариев видит больше строк
+    на странице и больше вариантов для связанных полей.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        cls.add_rows(3)
+
+    @classmethod
+    def add_rows(cls, count):
+        start = User.objects.count()
+        for i in range(start, start + count):
+            author = User.objects.create(username=f'author_{i}')
+            group = Group.objects.create(
+                title=f'Группа {i}', slug=f'group_{i}', description='-'
+            )
+            post = Post.objects.create(
+                author=author, group=group, text=f'Пост {i}'
+            )
+            Comment.objects.create(post=post, author=author, text='Текст')
+        analyze()
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def queries(self, url, data=None):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url, data)
+        self.assertEqual(response.status_code, 200)
+        return [query['sql'] for query in context.captured_queries]
+
+    def test_cost_independent_of_table_size(self):
+        """Проверяет, что число запросов не растёт вместе с таблицами и
+        что COUNT(*) не выполняется."""
+        for name, budget in (
+            ('admin:posts_post_changelist', 4),
+            ('admin:posts_comment_changelist', 4),
+        ):
+            url = reverse(name)
+            with self.subTest(url=url):
+                with query_budget(budget):
+                    small = self.queries(url)
+                self.add_rows(5)
+                large = self.queries(url)
+                self.assertEqual(len(small), len(large), large)
+                self.assertFalse(
+                    [sql for sql in large if 'COUNT(' in sql], large
+                )
+
+    def test_editable_fields_use_autocomplete(self):
+        """Проверяет, что в строках нет <select> со всеми группами и
+        авторами."""
+        for name, field in (
+            ('admin:posts_post_changelist', 'group'),
+            ('admin:posts_comment_changelist', 'author'),
+        ):
+            response = self.client.get(reverse(name))
+            content = response.content.decode()
+            self.assertIn('admin-autocomplete', content)
+            # в строке не больше пустого и выбранного варианта, ещё два -
+            # у <select> действий
+            self.assertLessEqual(
+                content.count('<option'),
+                len(response.context['cl'].result_list) * 2 + 2, field
+            )
+
+    def test_input_filters(self):
+        """Проверяет фильтры комментариев по автору и посту."""
+        comment = Comment.objects.select_related('author').first()
+        url = reverse('admin:posts_comment_changelist')
+        for data, expected in (
+            ({'author': comment.author.username}, [comment]),
+            ({'post': comment.post_id}, [comment]),
+            ({'post': 'nope'}, []),
+            ({'q': comment.author.username}, [comment]),
+        ):
+            with self.subTest(data=data):
+                response = self.client.get(url, data)
+                self.assertEqual(
+                    list(response.context['cl'].result_list), expected
+                )
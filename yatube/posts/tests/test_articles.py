@@ -0,0 +1,74 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.cache import bump_generation
+from core.metrics import CACHE_REQUESTS
+from .. import generations
+from ..models import Comment, Group, Post
+
+User = get_user_model()
+
+
+class ArticleCacheTest(TestCase):
+    """Тест кэша разметки постов в лентах."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test_group'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(ArticleCacheTest.author)
+
+    def hits(self):
+        return CACHE_REQUESTS.values.get(('article', 'hit'), 0)
+
+    def rebuild_index(self):
+        """Перестраивает ленту главной, не трогая разметку постов."""
+        bump_generation(generations.INDEX)
+        return self.author_client.get(reverse('posts:index'))
+
+    def test_feed_assembled_from_fragments(self):
+        """Проверяет, что перестроенная лента берёт пост из кэша."""
+        self.rebuild_index()
+        hits = self.hits()
+        response = self.rebuild_index()
+        self.assertEqual(self.hits(), hits + 1)
+        self.assertContains(response, 'Тестовый пост')
+
+    def test_variants(self):
+        """Проверяет, что профиль и группа не получают разметку главной."""
+        self.rebuild_index()
+        profile = self.author_client.get(
+            reverse('posts:profile', args=(self.author.username,))
+        )
+        group = self.author_client.get(
+            reverse('posts:group_list', args=(self.group.slug,))
+        )
+        index = self.rebuild_index()
+        self.assertContains(index, 'Автор:')
+        self.assertContains(index, 'все записи группы')
+        self.assertNotContains(profile, 'Автор:')
+        self.assertNotContains(group, 'все записи группы')
+
+    def test_edit_and_comment_invalidate(self):
+        """Проверяет, что правка и комментарий обновляют разметку."""
+        self.rebuild_index()
+        self.author_client.post(
+            reverse('posts:post_edit', args=(self.post.pk,)),
+            {'text': 'Исправленный пост', 'group': self.group.pk}
+        )
+        self.assertContains(self.rebuild_index(), 'Исправленный пост')
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий'
+        )
+        self.assertContains(self.rebuild_index(), 'комментариев: 1')
@@ -0,0 +1,122 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from posts import benchmark, search
+from posts.models import Comment, Follow, Group, Post, TimelineEntry, User
+
+TEMP_MEDIA_ROOT = tempfile.mktemp(dir=settings.BASE_DIR)
+SEED = dict(
+    users=6, groups=2, posts=40, comments=30, follows=8, images=2,
+    batch_size=7, force=True, stdout=StringIO(),
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedDataTest(TestCase):
+    """Тест наполнения базы синтетическими данными."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_seed(self):
+        """Проверяет объёмы и согласованность денормализованных данных."""
+        call_command('seed_data', **SEED)
+        self.assertEqual(User.objects.count(), 6)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 40)
+        self.assertEqual(Comment.objects.count(), 30)
+        self.assertEqual(Follow.objects.count(), 8)
+        self.assertGreater(
+            Post.objects.values('pub_date').distinct().count(), 1
+        )
+        self.assertTrue(Post.objects.exclude(image='').exists())
+        author = Post.objects.first().author
+        self.assertEqual(author.stats.posts_count, author.posts.count())
+        follow = Follow.objects.first()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=follow.user_id).count(),
+            Post.objects.filter(author__following__user=follow.user_id)
+            .count()
+        )
+        self.assertTrue(search.search_posts(Post.objects.all(), 'кот')
+                        .exists())
+        with self.assertRaises(CommandError):
+            call_command('seed_data', **SEED)
+
+    def test_seed_password_and_debug(self):
+        """Проверяет, что без DEBUG нужен --force, а случайный пароль
+        выводится один раз."""
+        with self.assertRaises(CommandError):
+            call_command('seed_data', **dict(SEED, force=False))
+        self.assertFalse(User.objects.exists())
+        out = StringIO()
+        call_command('seed_data', **dict(SEED, images=0, stdout=out))
+        password = out.getvalue().split('Пароль пользователей: ')[1].strip()
+        users = User.objects.all()
+        self.assertTrue(all(user.check_password(password) for user in users))
+        self.assertEqual(out.getvalue().count(password), 1)
+        out = StringIO()
+        call_command('seed_data', **dict(
+            SEED, images=0, prefix='other_', password='known', stdout=out
+        ))
+        self.assertNotIn('Пароль', out.getvalue())
+        self.assertTrue(
+            User.objects.get(username='other_0').check_password('known')
+        )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkTest(TransactionTestCase):
+    """Тест нагрузочного прогона."""
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_percentile(self):
+        """Проверяет перцентили по методу ближайшего ранга."""
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
+        self.assertEqual(benchmark.percentile([], 95), 0.0)
+
+    def test_benchmark(self):
+        """Проверяет прогон смеси запросов несколькими клиентами."""
+        call_command('seed_data', **dict(SEED, images=0))
+        targets = benchmark.Targets.from_db()
+        result = benchmark.run(
+            lambda: benchmark.LocalClient(targets.reader), targets,
+            clients=3, requests=40, warmup=2,
+        )
+        self.assertEqual(result.total, 40)
+        self.assertEqual(result.errors, {})
+        self.assertEqual(set(result.latencies), set(benchmark.MIX))
+        out = StringIO()
+        call_command('benchmark', clients=2, requests=10, stdout=out)
+        self.assertIn('total', out.getvalue())
+
+    def test_write_mix(self):
+        """Проверяет, что записи подмешиваются в смесь запросов."""
+        call_command('seed_data', **dict(SEED, images=0))
+        posts, comments = Post.objects.count(), Comment.objects.count()
+        targets = benchmark.Targets.from_db()
+        # общая in-memory база тестов не ждёт блокировок, поэтому
+        # записи идут от одного клиента
+        result = benchmark.run(
+            lambda: benchmark.LocalClient(targets.reader), targets,
+            clients=1, requests=60, write_share=0.5,
+        )
+        self.assertEqual(result.errors, {})
+        self.assertIn('posts:add_comment', result.latencies)
+        self.assertGreater(Post.objects.count(), posts)
+        self.assertEqual(
+            Comment.objects.count() - comments,
+            len(result.latencies['posts:add_comment'])
+        )
@@ -0,0 +1,209 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Post
+from ..threads import thread_page
+
+User = get_user_model()
+PER_PAGE = 3
+TOTAL = 7
+
+
+@override_settings(NUM_OF_COMMENTS=PER_PAGE)
+class CommentPaginationTest(TestCase):
+    """Тест постраничной загрузки комментариев."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+        created = Comment._meta.get_field('created')
+        created.auto_now_add = False
+        try:
+            # у части комментариев одинаковое время: курсор различает по id
+            now = timezone.now()
+            cls.comments = [
+                Comment.objects.create(
+                    post=cls.post, author=cls.author, text=f'Комментарий {i}',
+                    created=now + timedelta(seconds=i // 2)
+                ) for i in range(TOTAL)
+            ]
+        finally:
+            created.auto_now_add = True
+
+    def setUp(self):
+        cache.clear()
+
+    def texts(self, comments):
+        return [comment.text for comment in comments]
+
+    def test_first_page_inline(self):
+        """Проверяет, что страница поста выводит только первую порцию."""
+        response = self.client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        comments = response.context['comments']
+        self.assertEqual(
+            self.texts(comments), self.texts(self.comments[:PER_PAGE])
+        )
+        self.assertTrue(comments.has_next())
+        self.assertContains(response, 'data-comments-url')
+
+    def test_lazy_loading(self):
+        """Проверяет догрузку остальных комментариев по курсору."""
+        url = reverse('posts:post_detail', args=(self.post.pk,))
+        loaded = []
+        cursor = None
+        while True:
+            if cursor is None:
+                comments = self.client.get(url).context['comments']
+            else:
+                response = self.client.get(
+                    reverse('posts:post_comments', args=(self.post.pk,)),
+                    {'cursor': cursor}
+                )
+                self.assertTemplateUsed(
+                    response, 'posts/includes/comment_list.html'
+                )
+                self.assertNotContains(response, '<html')
+                comments = response.context['comments']
+            loaded += self.texts(comments)
+            if not comments.has_next():
+                break
+            cursor = comments.next_cursor
+        self.assertEqual(loaded, self.texts(self.comments))
+
+    def test_missing_post(self):
+        """Проверяет 404 для несуществующего поста и пустую порцию для
+        поста без комментариев."""
+        response = self.client.get(reverse('posts:post_comments', args=(0,)))
+        self.assertEqual(response.status_code, 404)
+        post = Post.objects.create(author=self.author, text='Без комментариев')
+        response = self.client.get(
+            reverse('posts:post_comments', args=(post.pk,))
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'data-comments-url')
+
+
+@override_settings(NUM_OF_COMMENTS=2, COMMENT_MAX_DEPTH=2)
+class ThreadTest(TestCase):
+    """Тест веток комментариев."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def comment(self, text, parent=None, post=None):
+        return Comment.objects.create(
+            post=post or self.post, author=self.author, text=text,
+            parent=parent
+        )
+
+    def threads(self, cursor=None):
+        page = thread_page(self.post.pk, cursor)
+        return page, [(c.text, c.depth) for c in page.threads]
+
+    def test_subtrees_in_one_query(self):
+        """Проверяет порядок вывода веток и чтение ответов одним
+        запросом."""
+        a = self.comment('a')
+        b = self.comment('b')
+        a1 = self.comment('a1', a)
+        self.comment('b1', b)
+        self.comment('a1a', a1)
+        self.comment('a2', a)
+        self.comment('c')
+        with self.assertNumQueries(2):
+            page, threads = self.threads()
+        self.assertEqual(threads, [
+            ('a', 0), ('a1', 1), ('a1a', 2), ('a2', 1), ('b', 0), ('b1', 1),
+        ])
+        _, threads = self.threads(page.next_cursor)
+        self.assertEqual(threads, [('c', 0)])
+
+    def test_depth_limit(self):
+        """Проверяет, что ответ глубже предела уходит на уровень выше."""
+        parent = self.comment('0')
+        for depth in range(1, 4):
+            parent = self.comment(str(depth), parent)
+        self.assertEqual(
+            [(c.text, c.depth) for c in self.threads()[0].threads],
+            [('0', 0), ('1', 1), ('2', 2), ('3', 2)]
+        )
+
+    @override_settings(NUM_OF_REPLIES=2)
+    def test_replies_capped(self):
+        """Проверяет, что ветка показывает не больше NUM_OF_REPLIES
+        ответов, а остальные догружаются порциями."""
+        a = self.comment('a')
+        a1 = self.comment('a1', a)
+        self.comment('a1a', a1)
+        self.comment('a2', a)
+        a3 = self.comment('a3', a)
+        self.comment('a3a', a3)
+        b = self.comment('b')
+        self.comment('b1', b)
+        with self.assertNumQueries(2):
+            page, threads = self.threads()
+        self.assertEqual(threads, [
+            ('a', 0), ('a1', 1), ('a1a', 2), ('b', 0), ('b1', 1),
+        ])
+        last = page.threads[2]
+        self.assertEqual(last.more_thread, a.pk)
+        self.assertFalse(hasattr(page.threads[4], 'more_thread'))
+        url = reverse('posts:post_comments', args=(self.post.pk,))
+        response = self.client.get(url, {'thread': a.pk, 'after': last.pk})
+        replies = response.context['replies']
+        self.assertEqual(
+            [c.text for c in replies], ['a2', 'a3']
+        )
+        self.assertContains(response, 'Показать ещё ответы')
+        response = self.client.get(
+            url, {'thread': a.pk, 'after': replies[-1].pk}
+        )
+        self.assertEqual(
+            [c.text for c in response.context['replies']], ['a3a']
+        )
+        self.assertNotContains(response, 'Показать ещё ответы')
+        for params in (
+            {'thread': b.pk, 'after': last.pk},
+            {'thread': a.pk, 'after': 'x'},
+            {'thread': a1.pk, 'after': last.pk},
+        ):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 404)
+
+    @override_settings(COMMENT_MAX_DEPTH=0)
+    def test_depth_limit_below_one(self):
+        """Проверяет, что при пределе меньше единицы ответ остаётся
+        ответом на корень ветки."""
+        root = self.comment('0')
+        reply = self.comment('2', self.comment('1', root))
+        self.assertEqual(reply.parent, root)
+        self.assertEqual(reply.depth, 1)
+
+    def test_reply_view(self):
+        """Проверяет ответ через форму и отказ отвечать в чужом посте."""
+        root = self.comment('root')
+        other = self.comment('other', post=Post.objects.create(
+            author=self.author, text='Другой пост'
+        ))
+        client = Client()
+        client.force_login(ThreadTest.author)
+        url = reverse('posts:add_comment', args=(self.post.pk,))
+        detail = client.get(
+            reverse('posts:post_detail', args=(self.post.pk,)),
+            {'reply': root.pk}
+        )
+        self.assertContains(detail, f'name="parent" value="{root.pk}"')
+        client.post(url, {'text': 'reply', 'parent': root.pk})
+        client.post(url, {'text': 'stray', 'parent': other.pk})
+        self.assertEqual(Comment.objects.get(text='reply').parent, root)
+        self.assertIsNone(Comment.objects.get(text='stray').parent)
@@ -0,0 +1,121 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import query_budget
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTest(TestCase):
+    """Тест условных GET страниц лент и поста."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test_group'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост'
+        )
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(cls.group.slug,)),
+            reverse('posts:profile', args=(cls.author.username,)),
+            reverse('posts:post_detail', args=(cls.post.pk,)),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(ConditionalGetTest.reader)
+
+    def etags(self, client):
+        return [client.get(url)['ETag'] for url in self.urls]
+
+    def assertNotModified(self, client, etags, expected=True):
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(
+                    response.status_code, 304 if expected else 200
+                )
+
+    def test_not_modified(self):
+        """Проверяет 304 без запроса ленты и рендеринга."""
+        etags = self.etags(self.client)
+        budgets = (0, 1, 1, 1)
+        for url, etag, budget in zip(self.urls, etags, budgets):
+            with self.subTest(url=url), query_budget(budget):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertFalse(response.content)
+
+    def test_etag_depends_on_user(self):
+        """Проверяет, что гость и пользователь получают разные ETag."""
+        etags = self.etags(self.client)
+        self.assertNotModified(self.reader_client, etags, expected=False)
+
+    def test_etag_depends_on_csrf_token(self):
+        """Проверяет, что новый CSRF-токен (например, после входа) меняет
+        ETag страниц вошедшего пользователя."""
+        etags = self.etags(self.reader_client)
+        self.assertNotModified(self.reader_client, etags)
+        del self.reader_client.cookies[settings.CSRF_COOKIE_NAME]
+        self.assertNotModified(self.reader_client, etags, expected=False)
+
+    def test_changes_invalidate(self):
+        """Проверяет, что новый пост, комментарий, подписка и правка
+        группы меняют ETag."""
+        changes = (
+            lambda: Post.objects.create(
+                author=self.author, group=self.group, text='Новый пост'
+            ),
+            lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'
+            ),
+            lambda: Group.objects.filter(pk=self.group.pk).first().save(),
+        )
+        for change in changes:
+            etags = self.etags(self.client)
+            change()
+            self.assertNotModified(self.client, etags, expected=False)
+
+    def test_follow_changes_profile(self):
+        """Проверяет, что подписка зрителя меняет ETag профиля."""
+        url = reverse('posts:profile', args=(self.author.username,))
+        etag = self.reader_client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Отписаться')
+
+    def test_own_follow_changes_profile(self):
+        """Проверяет, что отписка зрителя меняет ETag, даже если число
+        подписчиков не изменилось."""
+        url = reverse('posts:profile', args=(self.author.username,))
+        Follow.objects.create(user=self.reader, author=self.author)
+        etag = self.reader_client.get(url)['ETag']
+        Follow.objects.filter(user=self.reader).delete()
+        Follow.objects.create(
+            user=User.objects.create(username='other'), author=self.author
+        )
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Отписаться')
+
+    def test_missing_objects(self):
+        """Проверяет 404 для несуществующих группы, автора и поста."""
+        for url in (
+            reverse('posts:group_list', args=('missing',)),
+            reverse('posts:profile', args=('missing',)),
+            reverse('posts:post_detail', args=(0,)),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH='"0"')
+                self.assertEqual(response.status_code, 404)
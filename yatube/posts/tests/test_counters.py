@@ -0,0 +1,189 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    """Тест денормализованных счётчиков."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group_0 = Group.objects.create(
+            title='Тестовая группа 0', slug='test_group_0'
+        )
+        cls.group_1 = Group.objects.create(
+            title='Тестовая группа 1', slug='test_group_1'
+        )
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(CountersTest.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(CountersTest.reader)
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_counters(self):
+        """Проверяет счётчики постов автора и группы при создании,
+        смене группы и удалении поста."""
+        self.author_client.post(
+            reverse('posts:post_create'),
+            {'text': 'пост', 'group': CountersTest.group_0.pk}
+        )
+        post = Post.objects.get()
+        self.assertEqual(self.stats(CountersTest.author).posts_count, 1)
+        self.assertEqual(
+            Group.objects.get(pk=CountersTest.group_0.pk).posts_count, 1
+        )
+        self.author_client.post(
+            reverse('posts:post_edit', args=(post.pk,)),
+            {'text': 'пост', 'group': CountersTest.group_1.pk}
+        )
+        self.assertEqual(
+            Group.objects.get(pk=CountersTest.group_0.pk).posts_count, 0
+        )
+        self.assertEqual(
+            Group.objects.get(pk=CountersTest.group_1.pk).posts_count, 1
+        )
+        Post.objects.get(pk=post.pk).delete()
+        self.assertEqual(self.stats(CountersTest.author).posts_count, 0)
+        self.assertEqual(
+            Group.objects.get(pk=CountersTest.group_1.pk).posts_count, 0
+        )
+
+    def test_comment_counter(self):
+        """Проверяет счётчик комментариев поста."""
+        post = Post.objects.create(text='пост', author=CountersTest.author)
+        self.reader_client.post(
+            reverse('posts:add_comment', args=(post.pk,)),
+            {'text': 'комментарий'}
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        Comment.objects.all().delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_post_delete_cost(self):
+        """Проверяет, что удаление поста не обрабатывает каждый его
+        комментарий отдельно."""
+        queries = []
+        for count in (2, 20):
+            post = Post.objects.create(
+                text='пост', author=CountersTest.author
+            )
+            for i in range(count):
+                Comment.objects.create(
+                    post=post, author=CountersTest.reader, text=f'{i}'
+                )
+            with CaptureQueriesContext(connection) as context:
+                post.delete()
+            queries.append(len(context.captured_queries))
+        self.assertEqual(queries[0], queries[1])
+        self.assertFalse(Comment.objects.exists())
+        self.assertEqual(self.stats(CountersTest.author).posts_count, 0)
+        other = Post.objects.create(text='пост', author=CountersTest.author)
+        Comment.objects.create(
+            post=other, author=CountersTest.reader, text='ещё'
+        )
+        Comment.objects.all().delete()
+        other.refresh_from_db()
+        self.assertEqual(other.comments_count, 0)
+
+    def test_failed_post_delete_keeps_comment_counter(self):
+        """Проверяет, что после упавшего удаления поста его комментарии
+        снова уменьшают счётчик."""
+        for delete in (
+            lambda post: post.delete(),
+            lambda post: Post.objects.filter(pk=post.pk).delete(),
+        ):
+            post = Post.objects.create(
+                text='пост', author=CountersTest.author
+            )
+            Comment.objects.create(
+                post=post, author=CountersTest.reader, text='комментарий'
+            )
+            # сбой после каскада, но до post_delete-обработчика счётчиков
+            with mock.patch(
+                'posts.search.unindex_post', side_effect=DatabaseError
+            ), self.assertRaises(DatabaseError), transaction.atomic():
+                delete(post)
+            Comment.objects.filter(post=post).delete()
+            post.refresh_from_db()
+            self.assertEqual(post.comments_count, 0)
+
+    def test_missing_stats_not_created_on_view(self):
+        """Проверяет, что профиль без строки статистики показывает точные
+        числа и ничего не пишет в базу."""
+        Post.objects.create(text='пост', author=CountersTest.author)
+        Follow.objects.create(
+            user=CountersTest.reader, author=CountersTest.author
+        )
+        UserStats.objects.filter(user=CountersTest.author).delete()
+        response = self.client.get(
+            reverse('posts:profile', args=(CountersTest.author.username,))
+        )
+        stats = response.context['stats']
+        self.assertEqual(
+            (stats.posts_count, stats.followers_count), (1, 1)
+        )
+        self.assertFalse(
+            UserStats.objects.filter(user=CountersTest.author).exists()
+        )
+
+    def test_follow_counters(self):
+        """Проверяет счётчики подписчиков и подписок."""
+        follow_url = reverse(
+            'posts:profile_follow', args=(CountersTest.author.username,)
+        )
+        self.reader_client.get(follow_url)
+        self.reader_client.get(follow_url)
+        self.assertEqual(self.stats(CountersTest.author).followers_count, 1)
+        self.assertEqual(self.stats(CountersTest.reader).following_count, 1)
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', args=(CountersTest.author.username,)
+        ))
+        self.assertEqual(self.stats(CountersTest.author).followers_count, 0)
+        self.assertEqual(self.stats(CountersTest.reader).following_count, 0)
+
+    def test_recount_repairs_drift(self):
+        """Проверяет, что команда recount чинит разошедшиеся счётчики."""
+        Post.objects.bulk_create([
+            Post(text='пост', author=CountersTest.author,
+                 group=CountersTest.group_0),
+            Post(text='пост', author=CountersTest.author),
+        ])
+        Follow.objects.create(
+            user=CountersTest.reader, author=CountersTest.author
+        )
+        UserStats.objects.update(followers_count=7)
+        call_command('recount', stdout=StringIO())
+        stats = self.stats(CountersTest.author)
+        self.assertEqual(stats.posts_count, 2)
+        self.assertEqual(stats.followers_count, 1)
+        self.assertEqual(self.stats(CountersTest.reader).following_count, 1)
+        self.assertEqual(
+            Group.objects.get(pk=CountersTest.group_0.pk).posts_count, 1
+        )
+
+    def test_profile_uses_counter(self):
+        """Проверяет, что профиль не считает посты через COUNT(*)."""
+        Post.objects.create(text='пост', author=CountersTest.author)
+        response = self.reader_client.get(
+            reverse('posts:profile', args=(CountersTest.author.username,))
+        )
+        self.assertEqual(response.context['stats'].posts_count, 1)
+        self.assertContains(response, 'Всего постов: 1')
@@ -0,0 +1,61 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from .utils import QueryPlanMixin, explain_query_plan
+
+User = get_user_model()
+
+
+class FeedIndexTest(QueryPlanMixin, TestCase):
+    """Тест того, что запросы лент обслуживаются составными индексами."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test_group',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(FeedIndexTest.reader)
+
+    def test_feed_views_use_indexes(self):
+        """Проверяет планы запросов всех лент и страницы поста."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(FeedIndexTest.group.slug,)),
+            reverse('posts:profile', args=(FeedIndexTest.author.username,)),
+            reverse('posts:post_detail', args=(FeedIndexTest.post.pk,)),
+            reverse('posts:follow_index'),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertViewUsesIndexes(self.client, url)
+
+    def test_follow_lookup_uses_index(self):
+        """Проверяет, что поиск подписок по автору идёт по индексу."""
+        sql = str(
+            Follow.objects.filter(author=FeedIndexTest.author).values(
+                'user'
+            ).query
+        )
+        plan = '\n'.join(
+            step for step in explain_query_plan(sql)
+            if 'posts_follow' in step
+        )
+        self.assertIn('follow_author_user_idx', plan)
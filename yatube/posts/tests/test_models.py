@@ -1,8 +1,11 @@
+from io import StringIO
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import Comment, Group, Post
 
 User = get_user_model()
 
@@ -43,3 +46,35 @@ class PostTest(TestCase):
                     PostTest.post._meta.get_field(field).help_text,
                     text
                 )
+
+
+class RenderedTextTest(TestCase):
+    """Тест заранее построенной HTML-разметки текстов."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='user_for_tests')
+
+    def test_html_built_on_save(self):
+        """Проверяет экранирование и переносы строк при сохранении."""
+        post = Post.objects.create(author=self.user, text='<b>раз</b>\nдва')
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='a & b'
+        )
+        self.assertEqual(post.text_html, '&lt;b&gt;раз&lt;/b&gt;<br>два')
+        self.assertEqual(comment.text_html, 'a &amp; b')
+        post.text = 'три'
+        post.save(update_fields=['text'])
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, 'три')
+
+    def test_bulk_created_rows(self):
+        """Проверяет запасной рендер и команду render_texts для строк,
+        вставленных в обход save()."""
+        Post.objects.bulk_create([Post(author=self.user, text='x\ny')])
+        post = Post.objects.get()
+        self.assertEqual(post.text_html, '')
+        self.assertEqual(post.rendered_text, 'x<br>y')
+        call_command('render_texts', '--missing', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(post.text_html, 'x<br>y')
@@ -0,0 +1,135 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import query_budget
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class PageCacheTest(TestCase):
+    """Тест кэша страниц для анонимов и его точечного сброса."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.reader = User.objects.create(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа', slug='test_group'
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост'
+        )
+        cls.other_post = Post.objects.create(
+            author=cls.reader, text='Пост читателя'
+        )
+        cls.index = reverse('posts:index')
+        cls.group_url = reverse('posts:group_list', args=(cls.group.slug,))
+        cls.profile = reverse('posts:profile', args=(cls.author.username,))
+        cls.detail = reverse('posts:post_detail', args=(cls.post.pk,))
+        cls.other_detail = reverse(
+            'posts:post_detail', args=(cls.other_post.pk,)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def cached(self, url, client=None, **params):
+        """Прогревает страницу и возвращает, отдана ли она из кэша."""
+        client = client or self.client
+        client.get(url, params)
+        return client.get(url, params).context is None
+
+    def assertCached(self, *urls):
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertIsNone(self.client.get(url).context)
+
+    def assertRendered(self, *urls):
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertIsNotNone(self.client.get(url).context)
+
+    def test_anonymous_pages_cached(self):
+        """Проверяет, что повторная страница не вызывает вьюху и БД."""
+        urls = (self.index, self.group_url, self.profile, self.detail)
+        for url in urls:
+            first = self.client.get(url)
+            with self.subTest(url=url), query_budget(0):
+                second = self.client.get(url)
+            self.assertIsNone(second.context)
+            self.assertEqual(second.content, first.content)
+            self.assertEqual(second['ETag'], first['ETag'])
+            not_modified = self.client.get(
+                url, HTTP_IF_NONE_MATCH=first['ETag']
+            )
+            self.assertEqual(not_modified.status_code, 304)
+
+    def test_not_cached(self):
+        """Проверяет, что пользователям, лишним параметрам и 404 кэш
+        не отвечает."""
+        reader_client = Client()
+        reader_client.force_login(PageCacheTest.reader)
+        self.assertFalse(self.cached(self.index, reader_client))
+        self.assertFalse(self.cached(self.index, q='1'))
+        self.assertTrue(self.cached(self.index, page='1'))
+        missing = reverse('posts:post_detail', args=(0,))
+        self.assertFalse(self.cached(missing))
+
+    def test_page_number_normalized(self):
+        """Проверяет, что нечисловой номер берёт запись первой страницы,
+        а несуществующие номера не кэшируются."""
+        self.client.get(self.index)
+        self.assertIsNone(self.client.get(self.index, {'page': 'abc'}).context)
+        self.assertIsNone(self.client.get(self.index, {'page': '01'}).context)
+        for page in ('999', '-1'):
+            with self.subTest(page=page):
+                self.assertFalse(self.cached(self.index, page=page))
+        self.assertFalse(self.cached(self.detail, page='2'))
+
+    @override_settings(PAGE_CACHE_TIMEOUT=0)
+    def test_disabled(self):
+        """Проверяет отключение кэша настройкой."""
+        self.assertFalse(self.cached(self.index))
+
+    def test_comment_invalidates_its_post(self):
+        """Проверяет, что комментарий сбрасывает страницу своего поста
+        и ленты со счётчиком, но не страницу другого автора."""
+        for url in (self.index, self.profile, self.detail, self.other_detail):
+            self.client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        self.assertRendered(self.index, self.profile, self.detail)
+        self.assertCached(self.other_detail)
+
+    def test_post_invalidates_feeds(self):
+        """Проверяет сброс лент и счётчика постов автора новым постом."""
+        for url in (self.index, self.group_url, self.profile, self.detail,
+                    self.other_detail):
+            self.client.get(url)
+        Post.objects.create(author=self.author, text='Новый пост')
+        self.assertRendered(self.index, self.profile, self.detail)
+        self.assertCached(self.group_url, self.other_detail)
+        self.assertContains(self.client.get(self.index), 'Новый пост')
+
+    def test_follow_invalidates_profiles(self):
+        """Проверяет, что подписка сбрасывает профили обоих сторон."""
+        reader_profile = reverse(
+            'posts:profile', args=(self.reader.username,)
+        )
+        for url in (self.profile, reader_profile, self.index):
+            self.client.get(url)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertRendered(self.profile, reader_profile)
+        self.assertCached(self.index)
+
+    def test_group_change_clears_everything(self):
+        """Проверяет, что правка группы сбрасывает все страницы."""
+        for url in (self.index, self.other_detail):
+            self.client.get(url)
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertRendered(self.index, self.other_detail)
@@ -0,0 +1,132 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import query_budget
+from posts.models import Comment, Follow, Group, Post
+
+TEMP_MEDIA_ROOT = tempfile.mktemp(dir=settings.BASE_DIR)
+User = get_user_model()
+GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class QueryBudgetTest(TestCase):
+    """Бюджеты SQL-запросов страниц posts.
+
+    Данных больше страницы, у постов разные авторы, группы, картинки и
+    комментарии, поэтому забытый select_related даёт лишние запросы на
+    каждый пост и выходит за бюджет или повторяет запрос. Кэш очищается
+    перед каждым запросом: бюджет считается для холодного кэша.
+    """
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.authors = [
+            User.objects.create(username=f'author_{i}') for i in range(3)
+        ]
+        cls.reader = User.objects.create(username='reader')
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {i}', slug=f'group_{i}', description='Описание'
+            ) for i in range(2)
+        ]
+        for author in cls.authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        for i in range(settings.NUM_OF_POSTS + 3):
+            post = Post.objects.create(
+                author=cls.authors[i % 3],
+                group=cls.groups[i % 2],
+                text=f'Текст поста {i}',
+                image=SimpleUploadedFile(f'{i}.gif', GIF, 'image/gif'),
+            )
+            comments = [
+                Comment.objects.create(
+                    post=post, author=author, text='Комментарий'
+                ) for author in cls.authors
+            ]
+            Comment.objects.create(
+                post=post, author=cls.reader, text='Ответ',
+                parent=comments[0]
+            )
+        cls.post = post
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.guest = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(QueryBudgetTest.reader)
+        self.author_client = Client()
+        self.author_client.force_login(QueryBudgetTest.post.author)
+
+    def request(self, client, budget, url, data=None, method='get'):
+        cache.clear()
+        with self.subTest(url=url, method=method):
+            with query_budget(budget):
+                response = getattr(client, method)(url, data)
+            self.assertLess(response.status_code, 400)
+
+    def test_read_pages(self):
+        """Проверяет бюджеты страниц просмотра (в том числе запрос для
+        ETag у группы, профиля и поста)."""
+        post = QueryBudgetTest.post
+        for client, budget, url, data in (
+            (self.guest, 4, reverse('posts:index'), None),
+            (self.guest, 4, reverse('posts:index'), {'page': 2}),
+            (self.guest, 4, reverse(
+                'posts:group_list', args=(post.group.slug,)), None),
+            (self.guest, 5, reverse(
+                'posts:profile', args=(post.author.username,)), None),
+            (self.reader_client, 8, reverse(
+                'posts:profile', args=(post.author.username,)), None),
+            (self.guest, 5, reverse(
+                'posts:post_detail', args=(post.pk,)), None),
+            (self.reader_client, 7, reverse(
+                'posts:post_detail', args=(post.pk,)), None),
+            (self.guest, 2, reverse(
+                'posts:post_comments', args=(post.pk,)), None),
+            (self.guest, 3, reverse('posts:search'), {'q': 'текст'}),
+            (self.reader_client, 5, reverse('posts:follow_index'), None),
+        ):
+            self.request(client, budget, url, data)
+
+    def test_write_pages(self):
+        """Проверяет бюджеты форм и действий."""
+        post = QueryBudgetTest.post
+        author = post.author.username
+        for client, budget, url, data, method in (
+            (self.author_client, 3, reverse('posts:post_create'), None,
+             'get'),
+            (self.author_client, 11, reverse('posts:post_create'),
+             {'text': 'Новый пост', 'group': post.group_id}, 'post'),
+            (self.author_client, 4, reverse(
+                'posts:post_edit', args=(post.pk,)), None, 'get'),
+            (self.author_client, 9, reverse(
+                'posts:post_edit', args=(post.pk,)),
+             {'text': 'Правка', 'group': post.group_id}, 'post'),
+            (self.reader_client, 7, reverse(
+                'posts:add_comment', args=(post.pk,)),
+             {'text': 'Ещё комментарий'}, 'post'),
+            (self.reader_client, 9, reverse(
+                'posts:add_comment', args=(post.pk,)),
+             {'text': 'Ответ', 'parent': post.comments.first().pk}, 'post'),
+            (self.reader_client, 8, reverse(
+                'posts:profile_unfollow', args=(author,)), None, 'get'),
+            (self.reader_client, 9, reverse(
+                'posts:profile_follow', args=(author,)), None, 'get'),
+        ):
+            self.request(client, budget, url, data, method)
@@ -0,0 +1,144 @@
+from importlib import import_module
+from io import StringIO
+from unittest import mock
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, SearchTerm
+
+User = get_user_model()
+
+
+class TokenizerTest(TestCase):
+    """Тест разбиения текста на термы."""
+
+    def test_word_forms_share_stem(self):
+        """Проверяет, что формы одного слова дают один терм."""
+        for forms in (
+            ('пост', 'посты', 'постов', 'постами'),
+            ('группа', 'группы', 'группе', 'группой'),
+            ('котёнок', 'котенок'),
+        ):
+            with self.subTest(forms=forms):
+                stems = {tuple(search.tokenize(form)) for form in forms}
+                self.assertEqual(len(stems), 1)
+
+    def test_stop_words_and_case(self):
+        """Проверяет, что стоп-слова выбрасываются, а регистр неважен."""
+        self.assertEqual(
+            search.tokenize('И вот Django и на Python'),
+            ['django', 'python']
+        )
+
+
+class SearchTest(TestCase):
+    """Тест поиска по постам."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='author')
+        cls.cats = Post.objects.create(
+            text='Пушистые котята играют', author=cls.user
+        )
+        cls.dogs = Post.objects.create(
+            text='Собаки играли во дворе', author=cls.user
+        )
+
+    def setUp(self):
+        self.client = Client()
+        search._fts.clear()
+
+    def found(self, query):
+        return set(search.search_posts(Post.objects.all(), query))
+
+    def check_search(self):
+        self.assertEqual(
+            self.found('играет'), {SearchTest.cats, SearchTest.dogs}
+        )
+        self.assertEqual(self.found('пушистый котёнок'), set())
+        self.assertEqual(self.found('котята играют'), {SearchTest.cats})
+        self.assertEqual(self.found('и'), set())
+
+    def test_fts_backend(self):
+        """Проверяет поиск через FTS5 (если база его поддерживает)."""
+        if not search.fts_available():
+            self.skipTest('SQLite собран без FTS5')
+        self.check_search()
+
+    def test_fallback_backend(self):
+        """Проверяет поиск через таблицу SearchTerm."""
+        with mock.patch('posts.search.fts_available', return_value=False):
+            call_command('rebuild_search_index', stdout=StringIO())
+            self.assertTrue(SearchTerm.objects.exists())
+            self.check_search()
+
+    def test_migration_fills_index(self):
+        """Проверяет, что миграция поиска индексирует старые посты."""
+        migration = import_module('posts.migrations.0013_auto_20261018_1050')
+        schema_editor = mock.Mock(connection=connection)
+        SearchTerm.objects.all().delete()
+        with mock.patch('posts.search.fts_available', return_value=False):
+            with mock.patch.object(migration, 'FTS_TABLE', 'missing'):
+                migration.fill_index(apps, schema_editor)
+            self.check_search()
+        if search.fts_available():
+            with connection.cursor() as cursor:
+                cursor.execute(f'DELETE FROM {search.FTS_TABLE}')
+            migration.fill_index(apps, schema_editor)
+            self.check_search()
+
+    def test_index_follows_edits_and_deletes(self):
+        """Проверяет обновление индекса при правке и удалении поста."""
+        post = Post.objects.create(text='Редкое слово', author=self.user)
+        self.assertEqual(self.found('редкое'), {post})
+        post.text = 'Другой текст'
+        post.save()
+        self.assertEqual(self.found('редкое'), set())
+        self.assertEqual(self.found('другой'), {post})
+        post_id = post.pk
+        post.delete()
+        if search.fts_available():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'SELECT count(*) FROM {search.FTS_TABLE} '
+                    'WHERE rowid = %s', [post_id]
+                )
+                self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_search_view_paginates(self):
+        """Проверяет страницу поиска и сохранение запроса в пагинаторе."""
+        Post.objects.bulk_create(
+            Post(text=f'Котята номер {i}', author=SearchTest.user)
+            for i in range(settings.NUM_OF_POSTS)
+        )
+        call_command('rebuild_search_index', stdout=StringIO())
+        response = self.client.get(reverse('posts:search'), {'q': 'котята'})
+        self.assertTemplateUsed(response, 'posts/search.html')
+        self.assertEqual(
+            len(response.context['page_obj']), settings.NUM_OF_POSTS
+        )
+        self.assertContains(response, 'href="?q=%D0%BA')
+        second = self.client.get(
+            reverse('posts:search'), {'q': 'котята', 'page': 2}
+        )
+        self.assertEqual(list(second.context['page_obj']), [SearchTest.cats])
+
+    def test_admin_search_uses_index(self):
+        """Проверяет, что поиск в админке идёт через индекс."""
+        admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'собака'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list), [SearchTest.dogs]
+        )
@@ -0,0 +1,175 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template import Context, Template
+from django.test import Client, TestCase, TransactionTestCase
+from django.test import override_settings
+from django.urls import reverse
+from sorl.thumbnail import default, get_thumbnail
+
+from posts import thumbnails
+from posts.models import Post
+
+
+TEMP_MEDIA_ROOT = tempfile.mktemp(dir=settings.BASE_DIR)
+User = get_user_model()
+IMG_DATA = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def uploaded(name='small.gif'):
+    return SimpleUploadedFile(
+        name=name, content=IMG_DATA, content_type='image/gif'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailScheduleTest(TestCase):
+    """Тест постановки миниатюр в очередь при сохранении поста."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(ThumbnailScheduleTest.user)
+
+    def test_new_image_is_scheduled(self):
+        """Проверяет, что миниатюры ставятся в очередь только для новой
+        картинки, а не при каждой правке поста."""
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            self.client.post(
+                reverse('posts:post_create'),
+                {'text': 'пост с картинкой', 'image': uploaded()}
+            )
+            post = Post.objects.get()
+            schedule.assert_called_once_with(post.image.name)
+            schedule.reset_mock()
+            self.client.post(
+                reverse('posts:post_edit', args=(post.pk,)),
+                {'text': 'исправленный текст'}
+            )
+            schedule.assert_not_called()
+            self.client.post(
+                reverse('posts:post_edit', args=(post.pk,)),
+                {'text': 'новая картинка', 'image': uploaded('other.gif')}
+            )
+            post.refresh_from_db()
+            schedule.assert_called_once_with(post.image.name)
+
+    def test_post_without_image_is_not_scheduled(self):
+        """Проверяет, что пост без картинки не ставится в очередь."""
+        with mock.patch('posts.thumbnails.schedule') as schedule:
+            Post.objects.create(text='без картинки', author=self.user)
+        schedule.assert_not_called()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class PregenerateCommandTest(TransactionTestCase):
+    """Тест команды pregenerate_thumbnails."""
+
+    def tearDown(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_thumbnails_are_ready_before_render(self):
+        """Проверяет, что после команды рендер не строит миниатюры."""
+        user = User.objects.create(username='author')
+        with mock.patch('posts.thumbnails.schedule'):
+            posts = [
+                Post.objects.create(
+                    text=f'пост {i}', author=user,
+                    image=uploaded(f'img_{i}.gif')
+                )
+                for i in range(3)
+            ]
+        out = StringIO()
+        # общая in-memory база тестов не ждёт блокировок, поэтому
+        # параллельные записи в kvstore падали бы с "table is locked"
+        call_command('pregenerate_thumbnails', workers=1, stdout=out)
+        self.assertIn(
+            'Обработано изображений: 3, с ошибками: 0', out.getvalue()
+        )
+        with mock.patch.object(default.engine, 'get_image') as get_image:
+            for post in posts:
+                for geometry, options in thumbnails.THUMBNAILS:
+                    thumbnail = get_thumbnail(
+                        post.image.name, geometry, **options
+                    )
+                    self.assertTrue(thumbnail.exists())
+            get_image.assert_not_called()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ResponsiveImageTest(TestCase):
+    """Тест шаблонного тега responsive_image."""
+    template = Template(
+        '{% load post_images %}{% responsive_image post.image %}'
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        with mock.patch('posts.thumbnails.schedule'):
+            self.post = Post.objects.create(
+                text='пост', author=ResponsiveImageTest.user,
+                image=uploaded()
+            )
+
+    def render(self):
+        return self.template.render(Context({'post': self.post}))
+
+    def test_missing_variants_are_not_built_on_render(self):
+        """Проверяет, что без готовых вариантов рендер отдаёт исходную
+        картинку и только ставит варианты в очередь."""
+        with mock.patch('posts.thumbnails.ensure') as ensure, \
+                mock.patch.object(default.engine, 'get_image') as get_image:
+            html = self.render()
+        ensure.assert_called_once_with(self.post.image.name)
+        get_image.assert_not_called()
+        self.assertIn(f'src="{self.post.image.url}"', html)
+        self.assertNotIn('srcset', html)
+
+    def test_srcset_lists_all_widths(self):
+        """Проверяет srcset по всем ширинам и source для каждого
+        дополнительного формата."""
+        thumbnails.generate(self.post.image.name)
+        with mock.patch('posts.thumbnails.ensure') as ensure:
+            html = self.render()
+        ensure.assert_not_called()
+        for width in thumbnails.RESPONSIVE_WIDTHS:
+            self.assertIn(f' {width}w', html)
+        self.assertEqual(
+            html.count('<source'), len(thumbnails.FORMATS) - 1
+        )
+        self.assertNotIn(f'src="{self.post.image.url}"', html)
+
+    def test_no_image(self):
+        """Проверяет, что для поста без картинки разметки нет."""
+        self.post.image = ''
+        self.assertNotIn('<picture', self.render())
@@ -0,0 +1,116 @@
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.cache import cache
+from django.db import DatabaseError
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry
+
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    """Тест материализованной ленты подписок."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create(username='author')
+        cls.follower = User.objects.create(username='follower')
+        cls.old_post = Post.objects.create(
+            text='пост до подписки', author=cls.author
+        )
+
+    def timeline_posts(self):
+        return list(
+            TimelineEntry.objects.filter(
+                user=TimelineTest.follower
+            ).values_list('post', flat=True)
+        )
+
+    def test_follow_backfills_timeline(self):
+        """Проверяет, что подписка добавляет в ленту старые посты автора."""
+        Follow.objects.create(
+            user=TimelineTest.follower, author=TimelineTest.author
+        )
+        self.assertEqual(self.timeline_posts(), [TimelineTest.old_post.pk])
+
+    def test_new_post_fans_out(self):
+        """Проверяет, что новый пост попадает в ленты подписчиков."""
+        Follow.objects.create(
+            user=TimelineTest.follower, author=TimelineTest.author
+        )
+        post = Post.objects.create(text='новый пост', author=self.author)
+        self.assertEqual(
+            self.timeline_posts(), [post.pk, TimelineTest.old_post.pk]
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=TimelineTest.author).exists()
+        )
+
+    def test_unfollow_cleans_timeline(self):
+        """Проверяет, что отписка убирает посты автора из ленты."""
+        Follow.objects.create(
+            user=TimelineTest.follower, author=TimelineTest.author
+        )
+        Follow.objects.filter(user=TimelineTest.follower).delete()
+        self.assertEqual(self.timeline_posts(), [])
+
+    def test_backfill_command(self):
+        """Проверяет, что команда пересобирает ленту по подпискам."""
+        Follow.objects.create(
+            user=TimelineTest.follower, author=TimelineTest.author
+        )
+        TimelineEntry.objects.all().delete()
+        call_command('backfill_timeline', stdout=StringIO())
+        self.assertEqual(self.timeline_posts(), [TimelineTest.old_post.pk])
+
+    def test_rebuild_bulk_and_atomic(self):
+        """Проверяет, что пересборка не зависит от числа подписок по
+        запросам и при ошибке оставляет прежнюю ленту."""
+        for i in range(3):
+            author = User.objects.create(username=f'author_{i}')
+            Post.objects.create(text=f'пост {i}', author=author)
+            Follow.objects.create(user=TimelineTest.follower, author=author)
+        Follow.objects.create(
+            user=TimelineTest.follower, author=TimelineTest.author
+        )
+        before = self.timeline_posts()
+        self.assertEqual(len(before), 4)
+        with self.assertNumQueries(5):
+            timeline.rebuild([TimelineTest.follower.pk])
+        self.assertEqual(self.timeline_posts(), before)
+        with mock.patch(
+            'posts.timeline.TimelineEntry.objects.bulk_create',
+            side_effect=DatabaseError
+        ), self.assertRaises(DatabaseError):
+            timeline.rebuild()
+        self.assertEqual(self.timeline_posts(), before)
+
+    @override_settings(CURSOR_PAGINATION=True)
+    def test_follow_index_cursor_pages(self):
+        """Проверяет листание ленты подписок по курсорам."""
+        Follow.objects.create(
+            user=TimelineTest.follower, author=TimelineTest.author
+        )
+        Post.objects.bulk_create(
+            Post(text=f'пост {i}', author=TimelineTest.author)
+            for i in range(settings.NUM_OF_POSTS)
+        )
+        call_command('backfill_timeline', stdout=StringIO())
+        client = Client()
+        client.force_login(TimelineTest.follower)
+        cache.clear()
+        first = client.get(reverse('posts:follow_index')).context['page_obj']
+        second = client.get(
+            reverse('posts:follow_index'), {'cursor': first.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(len(first), settings.NUM_OF_POSTS)
+        self.assertEqual(list(second), [TimelineTest.old_post])
+        self.assertIsInstance(second[0], Post)
@@ -7,11 +7,21 @@ from django.contrib.auth import get_user_model
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.paginator import Page
-from django.test import Client, TestCase, override_settings
+from django.db import connection
+from django.template.loader import render_to_string
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from core.db import analyze
+from posts import generations
 from posts.forms import CommentForm, PostForm
 from posts.models import Comment, Follow, Group, Post
+from posts.utils import (
+    ElidedPaginator, EstimatedCountPaginator, do_page_obj
+)
 
 
 TEMP_MEDIA_ROOT = tempfile.mktemp(dir=settings.BASE_DIR)
@@ -76,6 +86,7 @@ class PostViewTest(TestCase):
         shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
 
     def setUp(self):
+        cache.clear()
         self.auth_client_0 = Client()
         self.auth_client_0.force_login(PostViewTest.user_0)
         self.auth_client_1 = Client()
@@ -195,13 +206,86 @@ class PostViewTest(TestCase):
     def test_is_index_page_data_cached(self):
         """Проверяет кэшироване главное страницы."""
         resp_before = self.auth_client_0.get(reverse('posts:index'))
-        Post.objects.all().delete()
+        Post.objects.update(
+            text='changed without signals',
+            text_html='changed without signals'
+        )
         resp_after = self.auth_client_0.get(reverse('posts:index'))
         cache.clear()
         resp_cleared_cache = self.auth_client_0.get(reverse('posts:index'))
         self.assertEqual(resp_before.content, resp_after.content)
         self.assertNotEqual(resp_before.content, resp_cleared_cache.content)
 
+    @override_settings(FEED_CACHE_TIMEOUT=0)
+    def test_feed_cache_timeout_setting(self):
+        """Проверяет, что фрагменты лент живут FEED_CACHE_TIMEOUT."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(PostViewTest.group_0.slug,)),
+            reverse('posts:profile', args=(PostViewTest.user_0.username,)),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(
+                    self.auth_client_0.get(url).context['cache_timeout'], 0
+                )
+                marker = f'marker for {url}'
+                Post.objects.filter(pk=PostViewTest.post.pk).update(
+                    text=marker, text_html=marker
+                )
+                self.assertContains(self.auth_client_0.get(url), marker)
+
+    def test_feed_cache_invalidated_on_changes(self):
+        """Проверяет, что кэш лент сбрасывается при создании, правке
+        и удалении поста, новом комментарии и изменении группы."""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(PostViewTest.group_0.slug,)),
+            reverse('posts:profile', args=(PostViewTest.user_0.username,)),
+        )
+        post = Post.objects.create(
+            group=PostViewTest.group_0,
+            text='fresh post',
+            author=PostViewTest.user_0
+        )
+        changes = {
+            'create': lambda: Post.objects.create(
+                group=PostViewTest.group_0,
+                text='another post',
+                author=PostViewTest.user_0
+            ),
+            'edit': lambda: self.auth_client_0.post(
+                reverse('posts:post_edit', args=(post.pk,)),
+                {'text': 'edited post', 'group': PostViewTest.group_0.pk}
+            ),
+            'group': lambda: Group.objects.get(
+                pk=PostViewTest.group_0.pk
+            ).save(),
+            'comment': lambda: Comment.objects.create(
+                post=post, author=PostViewTest.user_1, text='new comment'
+            ),
+            'delete': lambda: Post.objects.filter(pk=post.pk).delete(),
+        }
+        for name, change in changes.items():
+            for url in urls:
+                self.auth_client_0.get(url)
+            marker = f'marker for {name}'
+            Post.objects.filter(pk=PostViewTest.post.pk).update(
+                text=marker, text_html=marker
+            )
+            # update минует сигналы: сбрасываем только разметку поста,
+            # чтобы маркер появился, как только перестроится лента
+            generations.bump_articles(PostViewTest.post.pk)
+            for url in urls:
+                with self.subTest(change=name, url=url, cached=True):
+                    self.assertNotContains(
+                        self.auth_client_0.get(url), marker
+                    )
+            change()
+            for url in urls:
+                with self.subTest(change=name, url=url):
+                    self.assertContains(self.auth_client_0.get(url), marker)
+
     def test_can_auth_user_subscribe(self):
         """Проверяет может ли подписаться авторизованный пользователь."""
         Follow.objects.all().delete()
@@ -266,6 +350,7 @@ class PaginatorTest(TestCase):
         ]
 
     def setUp(self):
+        cache.clear()
         self.auth_client = Client()
         self.auth_client.force_login(PaginatorTest.user)
 
@@ -286,3 +371,132 @@ class PaginatorTest(TestCase):
         resp_p_1 = self.auth_client.get(reverse('posts:index'))
         resp_p_2 = self.auth_client.get(reverse('posts:index'), {'page': 2})
         self.assertNotEqual(resp_p_1.content, resp_p_2.content)
+
+    @override_settings(CURSOR_PAGINATION=True)
+    def test_cursor_paginator(self):
+        """Проверяет keyset-пагинацию: переход вперёд и назад по курсорам."""
+        for url_name in PaginatorTest.urls_to_count:
+            with self.subTest(url_name=url_name):
+                cache.clear()
+                first = self.auth_client.get(url_name).context['page_obj']
+                self.assertEqual(len(first), settings.NUM_OF_POSTS)
+                self.assertFalse(first.has_previous())
+                self.assertTrue(first.has_next())
+                second = self.auth_client.get(
+                    url_name, {'cursor': first.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second), PaginatorTest.PLUS_POSTS)
+                self.assertFalse(second.has_next())
+                self.assertFalse(set(first) & set(second))
+                back = self.auth_client.get(
+                    url_name, {'cursor': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+                self.assertFalse(back.has_previous())
+
+    @override_settings(CURSOR_PAGINATION=True)
+    def test_cursor_paginator_broken_cursor(self):
+        """Проверяет, что битый курсор открывает первую страницу."""
+        response = self.auth_client.get(
+            reverse('posts:index'), {'cursor': 'not-a-cursor'}
+        )
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), settings.NUM_OF_POSTS)
+        self.assertFalse(page_obj.has_previous())
+
+    @override_settings(CURSOR_PAGINATION=True)
+    def test_cursor_index_without_count(self):
+        """Проверяет, что курсорная главная не считает посты."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            self.auth_client.get(reverse('posts:index'))
+        self.assertFalse([
+            query for query in context.captured_queries
+            if 'COUNT(' in query['sql']
+        ])
+
+
+class ElidedPageRangeTest(SimpleTestCase):
+    """Тест сокращённой навигации по страницам."""
+
+    def render(self, count, page):
+        request = RequestFactory().get('/', {'page': page})
+        page_obj = do_page_obj(request, range(count), settings.NUM_OF_POSTS)
+        return render_to_string(
+            'posts/includes/paginator.html', {'page_obj': page_obj}
+        )
+
+    def test_range(self):
+        """Проверяет края, окно вокруг текущей страницы и пропуски."""
+        paginator = ElidedPaginator(range(1000), 10)
+        ellipsis = paginator.ELLIPSIS
+        self.assertEqual(
+            list(paginator.get_elided_page_range(50)),
+            [1, 2, ellipsis, 47, 48, 49, 50, 51, 52, 53, ellipsis, 99, 100]
+        )
+        self.assertEqual(
+            list(paginator.get_elided_page_range(1)),
+            [1, 2, 3, 4, ellipsis, 99, 100]
+        )
+        self.assertEqual(
+            list(ElidedPaginator(range(50), 10).get_elided_page_range(3)),
+            [1, 2, 3, 4, 5]
+        )
+
+    def test_rendered_size_constant(self):
+        """Проверяет, что размер навигации не растёт с числом постов."""
+        sizes = {
+            count: self.render(count, page=500).count('<li')
+            for count in (10_000, 100_000, 1_000_000)
+        }
+        self.assertEqual(len(set(sizes.values())), 1, sizes)
+        self.assertLess(sizes[1_000_000], 20)
+
+
+class EstimatedCountTest(TestCase):
+    """Тест приблизительного числа объектов в пагинаторе."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Пост {i}') for i in range(3)
+        )
+        analyze()
+        # статистика отстаёт от таблицы до следующего ANALYZE
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f'Новый {i}') for i in range(2)
+        )
+
+    def count(self, object_list, estimate=None):
+        return EstimatedCountPaginator(
+            object_list, 10, estimate=estimate
+        ).count
+
+    def test_table_statistics(self):
+        """Проверяет оценку по статистике и точный счёт ниже порога."""
+        with override_settings(ESTIMATED_COUNT_THRESHOLD=0):
+            self.assertEqual(self.count(Post.objects.all()), 3)
+        self.assertEqual(self.count(Post.objects.all()), 5)
+
+    def test_filtered_queryset(self):
+        """Проверяет, что выборку с фильтром оценивают только по
+        переданному счётчику."""
+        posts = Post.objects.filter(text__startswith='Новый')
+        with override_settings(ESTIMATED_COUNT_THRESHOLD=0):
+            self.assertEqual(self.count(posts), 2)
+            self.assertEqual(self.count(posts, estimate=7), 7)
+        self.assertEqual(self.count(posts, estimate=7), 2)
+
+    @override_settings(ESTIMATED_COUNT_THRESHOLD=0)
+    def test_admin_changelist(self):
+        """Проверяет, что список постов в админке не считает COUNT(*)."""
+        client = Client()
+        client.force_login(self.user)
+        response = client.get(reverse('admin:posts_post_changelist'))
+        changelist = response.context['cl']
+        self.assertEqual(changelist.result_count, 3)
+        self.assertIsNone(changelist.full_result_count)
+        self.assertEqual(len(changelist.result_list), 5)
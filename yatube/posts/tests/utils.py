@@ -0,0 +1,44 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+FEED_TABLES = ('posts_post', 'posts_comment', 'posts_follow',
+               'posts_timelineentry')
+
+
+def explain_query_plan(sql):
+    """Возвращает строки EXPLAIN QUERY PLAN для SQL-запроса (SQLite)."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class QueryPlanMixin:
+    """Проверки того, что запросы лент читают индекс, а не сортируют."""
+
+    def assertQueryUsesIndex(self, sql):
+        plan = explain_query_plan(sql)
+        details = '\n'.join(plan)
+        self.assertFalse(
+            any('TEMP B-TREE' in step for step in plan),
+            f'Запрос сортируется во временном B-tree:\n{sql}\n{details}'
+        )
+        for step in plan:
+            if step.startswith('SCAN') and 'INDEX' not in step:
+                self.fail(
+                    f'Запрос читает таблицу целиком:\n{sql}\n{details}'
+                )
+
+    def assertViewUsesIndexes(self, client, url):
+        """Выполняет запрос к url и проверяет все упорядоченные
+        SELECT'ы по таблицам лент."""
+        with CaptureQueriesContext(connection) as queries:
+            client.get(url)
+        checked = 0
+        for query in queries.captured_queries:
+            sql = query['sql']
+            if (sql.startswith('SELECT') and 'ORDER BY' in sql
+                    and any(table in sql for table in FEED_TABLES)):
+                with self.subTest(url=url, sql=sql):
+                    self.assertQueryUsesIndex(sql)
+                checked += 1
+        self.assertTrue(checked, f'{url} не выполнил ни одного запроса ленты')
@@ -0,0 +1,109 @@
+"""Ветки комментариев с материализованным путём.
+
+Путь комментария - id всех предков и его собственный, каждый с нулями
+до одной длины (models.path_segment). Поддерево ветки - это диапазон
+путей от пути корня до него же с символом больше любой цифры, поэтому
+ответы страницы читаются одним запросом по индексу (post, path) уже
+в порядке вывода. Постранично листаются корни веток, а в каждой ветке
+сразу показываются первые NUM_OF_REPLIES ответов; остальные
+догружаются порциями того же размера (thread_replies).
+"""
+from django.conf import settings
+from django.db.models import CharField, Q, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Concat, LPad
+
+from .models import PATH_DIGITS, PATH_SEP, Comment
+from .utils import CursorPaginator
+
+# больше любой цифры и разделителя: верхняя граница поддерева
+PATH_END = '~'
+ROOT_LENGTH = PATH_DIGITS + len(PATH_SEP)
+
+
+def replies(post_id, roots, limit):
+    """Первые limit + 1 ответов каждой ветки roots в порядке пути; лишний
+    ответ показывает, что в ветке есть что догрузить."""
+    ranges = Q()
+    for root in roots:
+        if not root.path:
+            continue
+        start, end = root.path, root.path + PATH_END
+        # путь (limit + 1)-го ответа ветки - верхняя граница диапазона;
+        # подзапрос тоже проходит по индексу (post, path)
+        bound = Comment.objects.filter(
+            post_id=post_id, path__gt=start, path__lt=end
+        ).order_by('path').values('path')[limit:limit + 1]
+        ranges |= Q(
+            path__gt=start,
+            path__lte=Coalesce(Subquery(bound), Value(end)),
+        )
+    if not ranges:
+        return []
+    return list(
+        Comment.objects.filter(ranges, post_id=post_id)
+        .select_related('author').order_by('path')
+    )
+
+
+def _cut(thread, root_id, limit):
+    """Первые limit ответов; последнему - ссылка на догрузку ветки."""
+    if len(thread) > limit:
+        thread = thread[:limit]
+        thread[-1].more_thread = root_id
+    return thread
+
+
+def flatten(roots, replies, limit):
+    """Корни с поддеревьями (не больше limit ответов) в порядке вывода."""
+    by_root = {}
+    for reply in replies:
+        by_root.setdefault(reply.path[:ROOT_LENGTH], []).append(reply)
+    for root in roots:
+        yield root
+        yield from _cut(by_root.get(root.path, []), root.pk, limit)
+
+
+def thread_page(post_id, cursor=None):
+    """Страница веток: корни по курсору (created, id), в page.threads -
+    корни вместе с первыми ответами для вывода за один проход."""
+    roots = Comment.objects.filter(
+        post_id=post_id, parent__isnull=True
+    ).select_related('author')
+    page = CursorPaginator(
+        roots, settings.NUM_OF_COMMENTS,
+        date_field='created', descending=False
+    ).get_page(cursor)
+    limit = settings.NUM_OF_REPLIES
+    page.threads = list(flatten(page, replies(post_id, page, limit), limit))
+    return page
+
+
+def thread_replies(post_id, root_id, after_id):
+    """Следующие ответы ветки root_id после ответа after_id в порядке
+    пути или None, если root_id - не корень или after_id не из его
+    ветки."""
+    paths = dict(Comment.objects.filter(
+        post_id=post_id, pk__in=(root_id, after_id)
+    ).values_list('pk', 'path'))
+    root, after = paths.get(root_id, ''), paths.get(after_id, '')
+    if len(root) != ROOT_LENGTH or after == root or (
+        not after.startswith(root)
+    ):
+        return None
+    limit = settings.NUM_OF_REPLIES
+    thread = list(
+        Comment.objects.filter(
+            post_id=post_id, path__gt=after, path__lt=root + PATH_END
+        ).select_related('author').order_by('path')[:limit + 1]
+    )
+    return _cut(thread, root_id, limit)
+
+
+def fill_paths():
+    """Пути для корней, вставленных в обход save() (bulk_create)."""
+    return Comment.objects.filter(path='', parent__isnull=True).update(
+        path=Concat(
+            LPad(Cast('pk', CharField()), PATH_DIGITS, Value('0')),
+            Value(PATH_SEP)
+        )
+    )
@@ -0,0 +1,208 @@
+"""Заблаговременная генерация миниатюр изображений постов.
+
+Каждая картинка поста нарезается на набор ширин (RESPONSIVE_WIDTHS) в
+JPEG и, если Pillow собран с libwebp, в WebP. Варианты строятся заранее:
+после сохранения поста - в пуле потоков, для уже загруженных картинок -
+командой pregenerate_thumbnails. Шаблонный тег responsive_image только
+ищет готовые варианты и никогда не строит их во время рендера.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from PIL import features
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE, KVStore as CachedDbKVStore
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+from core import pagecache
+
+from . import generations
+from .metrics import THUMBNAIL_SECONDS
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+RESPONSIVE_WIDTHS = (320, 640, 960, 1920)
+ASPECT_RATIO = (960, 339)
+MIME_TYPES = {'WEBP': 'image/webp', 'JPEG': 'image/jpeg'}
+FORMATS = tuple(
+    fmt for fmt in MIME_TYPES if fmt != 'WEBP' or features.check('webp')
+)
+OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def geometry(width):
+    ratio_width, ratio_height = ASPECT_RATIO
+    return f'{width}x{round(width * ratio_height / ratio_width)}'
+
+
+THUMBNAILS = tuple(
+    (geometry(width), dict(OPTIONS, format=fmt))
+    for fmt in FORMATS
+    for width in RESPONSIVE_WIDTHS
+)
+
+_executor = None
+
+
+def generate(image_name):
+    """Строит все миниатюры одного изображения."""
+    with THUMBNAIL_SECONDS.time():
+        for geometry_string, options in THUMBNAILS:
+            get_thumbnail(image_name, geometry_string, **options)
+
+
+def thumbnail_file(image_name, geometry_string, options):
+    """ImageFile миниатюры с тем же именем, что построит sorl-thumbnail.
+
+    Повторяет нормализацию опций из ThumbnailBackend.get_thumbnail,
+    но ничего не генерирует и не читает.
+    """
+    backend = default.backend
+    source = ImageFile(image_name)
+    options = dict(options)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault('format', backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, geometry_string, options)
+    return ImageFile(name, default.storage)
+
+
+def lookup(image_name, geometry_string, options):
+    """Готовая миниатюра из хранилища sorl-thumbnail или None."""
+    return default.kvstore.get(
+        thumbnail_file(image_name, geometry_string, options)
+    )
+
+
+def prefetch(image_names):
+    """Читает варианты всех картинок страницы из kvstore одним запросом.
+
+    Кэширующий kvstore sorl-thumbnail ходит в базу за каждым ключом,
+    которого нет в кэше, - по запросу на вариант каждого поста. Здесь
+    недостающие ключи читаются разом и кладутся в кэш так же, как это
+    делает сам kvstore, поэтому следующие lookup в базу не ходят.
+    """
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDbKVStore):
+        return
+    keys = [
+        add_prefix(thumbnail_file(
+            image_name, geometry(width), dict(OPTIONS, format=fmt)
+        ).key)
+        for image_name in set(image_names)
+        for fmt in FORMATS
+        for width in RESPONSIVE_WIDTHS
+    ]
+    found = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if not missing:
+        return
+    values = dict(
+        KVStoreModel.objects.filter(key__in=missing).values_list(
+            'key', 'value'
+        )
+    )
+    kvstore.cache.set_many(
+        {key: values.get(key, EMPTY_VALUE) for key in missing},
+        sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+    )
+
+
+def variants(image_name):
+    """Готовые варианты картинки: {формат: [(ширина, url), ...]}."""
+    prefetch((image_name,))
+    found = {}
+    for fmt in FORMATS:
+        for width in RESPONSIVE_WIDTHS:
+            thumbnail = lookup(
+                image_name, geometry(width), dict(OPTIONS, format=fmt)
+            )
+            if thumbnail is not None:
+                found.setdefault(fmt, []).append((width, thumbnail.url))
+    return found
+
+
+def _generate_in_worker(image_name):
+    try:
+        generate(image_name)
+        # ленты могли закэшироваться с исходной картинкой вместо вариантов
+        posts = Post.objects.filter(image=image_name).values(
+            'pk', 'author_id', 'group_id'
+        )
+        for post in posts:
+            generations.bump_post(post['author_id'], post['group_id'])
+            generations.bump_articles(post['pk'])
+            pagecache.invalidate(generations.post_scope(post['pk']))
+    except Exception:
+        logger.exception('Не удалось построить миниатюры %s', image_name)
+    finally:
+        close_old_connections()
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails'
+        )
+    return _executor
+
+
+def submit(image_name):
+    if settings.THUMBNAIL_WORKERS:
+        executor().submit(_generate_in_worker, image_name)
+    else:
+        generate(image_name)
+
+
+def ensure(image_name):
+    """Ставит в очередь генерацию недостающих вариантов, встреченных
+    при рендере, не чаще раза в минуту на картинку."""
+    if settings.THUMBNAIL_WORKERS and cache.add(
+        f'thumbnails:queued:{image_name}', 1, 60
+    ):
+        executor().submit(_generate_in_worker, image_name)
+
+
+def schedule(image_name):
+    """Ставит генерацию миниатюр в очередь после коммита транзакции,
+    не задерживая ответ на запрос."""
+    transaction.on_commit(lambda: submit(image_name))
+
+
+def generate_many(image_names, workers):
+    """Параллельно строит миниатюры; возвращает число обработанных
+    изображений и список тех, на которых случилась ошибка."""
+    done, failed = 0, []
+
+    def run(image_name):
+        try:
+            generate(image_name)
+            return image_name, None
+        except Exception as error:
+            return image_name, error
+        finally:
+            close_old_connections()
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for image_name, error in pool.map(run, image_names):
+            done += 1
+            if error is not None:
+                failed.append((image_name, error))
+    return done, failed
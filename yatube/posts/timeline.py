@@ -0,0 +1,69 @@
+"""Fan-out-on-write для ленты подписок (модель TimelineEntry)."""
+from itertools import islice
+
+from django.db import transaction
+
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 1000
+
+
+def _bulk_insert(entries):
+    # bulk_create сначала собирает все объекты в список, поэтому
+    # генератор режется на порции здесь
+    entries = iter(entries)
+    batch = list(islice(entries, BATCH_SIZE))
+    while batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+        batch = list(islice(entries, BATCH_SIZE))
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост в ленты всех подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def add_author(user_id, author_id):
+    """Добавляет в ленту подписчика все посты нового автора."""
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'pub_date')
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts.iterator()
+    )
+
+
+def remove_author(user_id, author_id):
+    """Убирает из ленты подписчика посты автора, от которого он отписался."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(user_ids=None):
+    """Пересобирает ленты заданных (или всех) пользователей с нуля.
+
+    Удаление и вставка идут в одной транзакции: читатели не видят
+    пустую ленту, а ошибка посередине оставляет старую.
+    """
+    entries = TimelineEntry.objects.all()
+    follows = Follow.objects.filter(author__posts__isnull=False)
+    if user_ids is not None:
+        entries = entries.filter(user_id__in=user_ids)
+        follows = follows.filter(user_id__in=user_ids)
+    rows = follows.values_list(
+        'user_id', 'author__posts__pk', 'author__posts__pub_date'
+    )
+    with transaction.atomic():
+        entries.delete()
+        _bulk_insert(
+            TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+            for user_id, pk, pub_date in rows.iterator()
+        )
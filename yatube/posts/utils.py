@@ -1,7 +1,233 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
 
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
 
-def do_page_obj(request, q_set, num_of_items):
+from core.db import estimate_rows
+
+CURSOR_PARAM = 'cursor'
+CURSOR_SEP = '|'
+NEXT, PREV = 'n', 'p'
+
+
+def encode_cursor(direction, key):
+    """Кодирует направление и ключ (дата, id) в непрозрачную строку."""
+    stamp, pk = key
+    raw = CURSOR_SEP.join((direction, stamp.isoformat(), str(pk)))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Возвращает (направление, (дата, id)) или None для битого курсора."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        direction, stamp, pk = raw.split(CURSOR_SEP)
+        stamp = parse_datetime(stamp)
+        pk = int(pk)
+    except (binascii.Error, UnicodeError, ValueError):
+        return None
+    if direction not in (NEXT, PREV) or stamp is None:
+        return None
+    return direction, (stamp, pk)
+
+
+class CursorPage(Page):
+    """Страница keyset-пагинации: вместо номеров - курсоры соседей."""
+    cursor_based = True
+
+    def __init__(self, object_list, cursor, paginator,
+                 has_next, has_previous):
+        super().__init__(object_list, cursor or 1, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next:
+            return None
+        return self.paginator.cursor_for(NEXT, self.object_list[-1])
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous:
+            return None
+        return self.paginator.cursor_for(PREV, self.object_list[0])
+
+
+class CursorPaginator(Paginator):
+    """Пагинатор по ключу (дата, id) без COUNT(*) и OFFSET.
+
+    Каждая страница - это один индексный диапазон после (или до)
+    ключа из курсора, поэтому страница N стоит столько же, сколько первая.
+    key - пара полей для сортировки и фильтрации, если вместо объектов
+    листают их индекс (например, материализованную ленту), а на странице
+    показывают сами объекты: значения курсора берутся из date_field и pk
+    объектов страницы.
+    """
+
+    def __init__(self, object_list, per_page,
+                 date_field='pub_date', descending=True, key=None):
+        self.date_field = date_field
+        self.descending = descending
+        self.key = key or (date_field, 'pk')
+        super().__init__(
+            object_list.order_by(*self._ordering(descending)), per_page
+        )
+
+    def _ordering(self, descending):
+        sign = '-' if descending else ''
+        return tuple(f'{sign}{lookup}' for lookup in self.key)
+
+    def _after(self, key, descending):
+        lookup = 'lt' if descending else 'gt'
+        date_lookup, pk_lookup = self.key
+        stamp, pk = key
+        return (
+            Q(**{f'{date_lookup}__{lookup}': stamp})
+            | Q(**{date_lookup: stamp, f'{pk_lookup}__{lookup}': pk})
+        )
+
+    def cursor_for(self, direction, obj):
+        return encode_cursor(
+            direction, (getattr(obj, self.date_field), obj.pk)
+        )
+
+    def get_page(self, cursor):
+        decoded = decode_cursor(cursor) if cursor else None
+        per_page = self.per_page
+        if decoded is None:
+            items = list(self.object_list[:per_page + 1])
+            return CursorPage(
+                items[:per_page], None, self,
+                has_next=len(items) > per_page, has_previous=False
+            )
+        direction, key = decoded
+        if direction == NEXT:
+            items = list(
+                self.object_list.filter(
+                    self._after(key, self.descending)
+                )[:per_page + 1]
+            )
+            return CursorPage(
+                items[:per_page], cursor, self,
+                has_next=len(items) > per_page, has_previous=True
+            )
+        items = list(
+            self.object_list.filter(self._after(key, not self.descending))
+            .order_by(*self._ordering(not self.descending))[:per_page + 1]
+        )
+        has_previous = len(items) > per_page
+        items = items[:per_page]
+        items.reverse()
+        return CursorPage(
+            items, cursor, self,
+            has_next=True, has_previous=has_previous
+        )
+
+
+class ElidedPaginator(Paginator):
+    """Paginator с сокращённым списком номеров страниц.
+
+    Повторяет Paginator.get_elided_page_range из Django 3.2: навигация
+    по ленте из тысяч страниц выводит только края и окно вокруг текущей.
+    """
+    ELLIPSIS = '…'
+
+    def get_elided_page_range(self, number=1, on_each_side=3, on_ends=2):
+        number = self.validate_number(number)
+        if self.num_pages <= (on_each_side + on_ends) * 2:
+            yield from self.page_range
+            return
+        if number > (1 + on_each_side + on_ends) + 1:
+            yield from range(1, on_ends + 1)
+            yield self.ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < (self.num_pages - on_each_side - on_ends) - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(
+                self.num_pages - on_ends + 1, self.num_pages + 1
+            )
+        else:
+            yield from range(number + 1, self.num_pages + 1)
+
+
+def table_estimate(object_list):
+    """Оценка числа строк для выборки всей таблицы, иначе None."""
+    query = getattr(object_list, 'query', None)
+    if query is None or query.where or query.distinct or (
+        query.combinator or query.group_by is not None
+        or not query.can_filter()
+    ):
+        return None
+    return estimate_rows(object_list.model, object_list.db)
+
+
+def estimated_count(object_list, estimate=None):
+    """Число объектов: оценка, если она не меньше порога, иначе COUNT(*).
+
+    estimate - заранее известная оценка (например, денормализованный
+    счётчик); без неё для выборки без фильтров берётся статистика базы.
+    На маленьких выборках точный COUNT(*) дёшев, а ошибка оценки была
+    бы заметна, поэтому ниже ESTIMATED_COUNT_THRESHOLD считаем точно.
+    """
+    if estimate is None:
+        estimate = table_estimate(object_list)
+    if estimate is None or estimate < settings.ESTIMATED_COUNT_THRESHOLD:
+        # точный счёт как у Paginator: count() выборки или len() списка
+        return Paginator(object_list, 1).count
+    return estimate
+
+
+class EstimatedCountPaginator(ElidedPaginator):
+    """Paginator с приблизительным числом объектов (см. estimated_count).
+
+    Подходит и для лент, и для ModelAdmin.paginator. Если оценка больше
+    настоящего числа, последние страницы окажутся пустыми.
+    """
+
+    def __init__(self, object_list, per_page, orphans=0,
+                 allow_empty_first_page=True, estimate=None):
+        super().__init__(
+            object_list, per_page, orphans, allow_empty_first_page
+        )
+        self.estimate = estimate
+
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list, self.estimate)
+
+
+def do_page_obj(request, q_set, num_of_items, cursor=False, key=None,
+                count=None, estimate=None):
+    if cursor:
+        paginator = CursorPaginator(q_set, num_of_items, key=key)
+        return paginator.get_page(request.GET.get(CURSOR_PARAM))
     page_num = request.GET.get('page')
-    paginator = Paginator(q_set, num_of_items)
-    return paginator.get_page(page_num)
+    paginator = EstimatedCountPaginator(
+        q_set, num_of_items, estimate=estimate
+    )
+    if count is not None:
+        # заранее известное число объектов избавляет от COUNT(*)
+        paginator.count = count
+    page_obj = paginator.get_page(page_num)
+    page_obj.elided_page_range = list(
+        paginator.get_elided_page_range(page_obj.number)
+    )
+    return page_obj
@@ -1,63 +1,159 @@
+from urllib.parse import urlencode
+
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import condition
+
+from core import pagecache
+from core.cache import get_or_rebuild
 
+from . import conditional, counters, generations, threads
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import do_page_obj
+from .models import Follow, Post, User
+from .search import search_posts
+from .utils import CURSOR_PARAM, do_page_obj, estimated_count
 
 
+@pagecache.anonymous_page_cache
+@condition(etag_func=conditional.index_etag)
 def index(request):
     posts = Post.objects.select_related('author', 'group')
-    page_obj = do_page_obj(request, posts, settings.NUM_OF_POSTS)
+    cache_generation = generations.index_generation()
+    count = None
+    if not settings.CURSOR_PAGINATION:
+        # курсорной пагинации число постов не нужно
+        count = get_or_rebuild(
+            'index_count', lambda: estimated_count(posts),
+            settings.FEED_CACHE_TIMEOUT, cache_generation
+        )
+    page_obj = do_page_obj(
+        request, posts, settings.NUM_OF_POSTS, settings.CURSOR_PAGINATION,
+        count=count
+    )
     context = {
         'page_obj': page_obj,
+        'cache_generation': cache_generation,
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
-    return render(request, 'posts/index.html', context)
+    return pagecache.tag(
+        render(request, 'posts/index.html', context), generations.INDEX,
+        page=page_obj.number
+    )
 
 
+@pagecache.anonymous_page_cache
+@condition(etag_func=conditional.group_etag)
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    group = conditional.group_for(request, slug)
+    if group is None:
+        raise Http404
     posts = group.posts.select_related('author', 'group')
-    page_obj = do_page_obj(request, posts, settings.NUM_OF_POSTS)
+    page_obj = do_page_obj(
+        request, posts, settings.NUM_OF_POSTS, settings.CURSOR_PAGINATION,
+        estimate=group.posts_count
+    )
     context = {
         'group': group,
         'page_obj': page_obj,
+        'cache_generation': generations.group_generation(group),
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
-    return render(request, 'posts/group_list.html', context)
+    return pagecache.tag(
+        render(request, 'posts/group_list.html', context),
+        generations.group_scope(group.pk), page=page_obj.number
+    )
 
 
+@pagecache.anonymous_page_cache
+@condition(etag_func=conditional.profile_etag)
 def profile(request, username):
-    posts_owner = get_object_or_404(User, username=username)
+    posts_owner = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
     posts = posts_owner.posts.select_related('author', 'group')
-    page_obj = do_page_obj(request, posts, settings.NUM_OF_POSTS)
-    user = request.user
-    following = (
-        user.is_authenticated
-        and user != posts_owner
-        and Follow.objects.filter(user=user, author=posts_owner).exists()
+    stats = counters.stats_for(posts_owner)
+    page_obj = do_page_obj(
+        request, posts, settings.NUM_OF_POSTS, settings.CURSOR_PAGINATION,
+        estimate=stats.posts_count
     )
+    following = conditional.following_for(request, posts_owner.pk)
     context = {
         'page_obj': page_obj,
         'posts_owner': posts_owner,
-        'following': following
+        'stats': stats,
+        'following': following,
+        'cache_generation': generations.author_generation(posts_owner),
+        'cache_timeout': settings.FEED_CACHE_TIMEOUT,
     }
-    return render(request, 'posts/profile.html', context)
+    return pagecache.tag(
+        render(request, 'posts/profile.html', context),
+        generations.author_scope(posts_owner.pk),
+        generations.stats_scope(posts_owner.pk), page=page_obj.number
+    )
 
 
+@pagecache.anonymous_page_cache
+@condition(etag_func=conditional.post_etag)
 def post_detail(request, post_id):
     post = get_object_or_404(
-        Post.objects.select_related('author', 'group'),
+        Post.objects.select_related('author__stats', 'group'),
         pk=post_id
     )
     form = CommentForm()
-    comments = post.comments.select_related('author')
+    reply = request.GET.get('reply', '')
     context = {
         'post': post,
         'form': form,
-        'comments': comments
+        'reply': reply if reply.isdigit() else None,
+        'comments': threads.thread_page(
+            post.pk, request.GET.get(CURSOR_PARAM)
+        ),
     }
-    return render(request, 'posts/post_detail.html', context)
+    return pagecache.tag(
+        render(request, 'posts/post_detail.html', context),
+        generations.post_scope(post.pk),
+        generations.stats_scope(post.author_id)
+    )
+
+
+def post_comments(request, post_id):
+    """Следующая порция веток комментариев (или ответов одной ветки при
+    ?thread=&after=) фрагментом HTML для догрузки."""
+    thread = request.GET.get('thread', '')
+    after = request.GET.get('after', '')
+    if thread or after:
+        replies = None
+        if thread.isdigit() and after.isdigit():
+            replies = threads.thread_replies(post_id, int(thread), int(after))
+        if replies is None:
+            raise Http404
+        return render(request, 'posts/includes/reply_list.html', {
+            'post_id': post_id,
+            'replies': replies,
+        })
+    comments = threads.thread_page(post_id, request.GET.get(CURSOR_PARAM))
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return render(request, 'posts/includes/comment_list.html', {
+        'post_id': post_id,
+        'comments': comments,
+    })
+
+
+def search(request):
+    query = request.GET.get('q', '').strip()
+    posts = search_posts(Post.objects.select_related('author', 'group'), query)
+    page_obj = do_page_obj(
+        request, posts, settings.NUM_OF_POSTS, settings.CURSOR_PAGINATION
+    )
+    context = {
+        'page_obj': page_obj,
+        'query': query,
+        'page_query': f'{urlencode({"q": query})}&',
+    }
+    return render(request, 'posts/search.html', context)
 
 
 @login_required
@@ -77,7 +173,7 @@ def post_create(request):
 @login_required
 def post_edit(request, post_id):
     post_obj = get_object_or_404(Post, id=post_id)
-    if request.user != post_obj.author:
+    if request.user.pk != post_obj.author_id:
         return redirect('posts:post_detail', post_id)
     form = PostForm(
         request.POST or None,
@@ -99,6 +195,10 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
+        parent_id = request.POST.get('parent', '')
+        if parent_id.isdigit():
+            # ответ на комментарий другого поста станет обычным
+            comment.parent = post.comments.filter(pk=parent_id).first()
         comment.save()
     return redirect('posts:post_detail', post_id)
 
@@ -106,9 +206,14 @@ def add_comment(request, post_id):
 @login_required
 def follow_index(request):
     follower = request.user
-    posts = Post.objects.filter(
-        author__following__user=follower).select_related('group', 'author')
-    page_obj = do_page_obj(request, posts, settings.NUM_OF_POSTS)
+    entries = follower.timeline.select_related(
+        'post__group', 'post__author'
+    ).order_by('-pub_date', '-post_id')
+    page_obj = do_page_obj(
+        request, entries, settings.NUM_OF_POSTS, settings.CURSOR_PAGINATION,
+        key=('pub_date', 'post_id')
+    )
+    page_obj.object_list = [entry.post for entry in page_obj]
     context = {'page_obj': page_obj}
     return render(request, 'posts/follow.html', context)
 
@@ -1,3 +1,50 @@
-# from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
 
-# Create your tests here.
+from core.testing import query_budget
+
+User = get_user_model()
+
+
+class QueryBudgetTest(TestCase):
+    """Бюджеты SQL-запросов страниц users."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user('user', 'user@example.com', 'pass')
+
+    def setUp(self):
+        cache.clear()
+        self.guest = Client()
+        self.user_client = Client()
+        self.user_client.force_login(QueryBudgetTest.user)
+
+    def test_pages(self):
+        """Проверяет бюджеты страниц регистрации и входа."""
+        for client, budget, name, data, method in (
+            (self.guest, 0, 'users:signup', None, 'get'),
+            (self.guest, 3, 'users:signup', {
+                'username': 'new', 'email': 'new@example.com',
+                'password1': 'Very-Secret-42', 'password2': 'Very-Secret-42',
+            }, 'post'),
+            (self.guest, 0, 'users:login', None, 'get'),
+            (self.guest, 5, 'users:login',
+             {'username': 'user', 'password': 'pass'}, 'post'),
+            (self.user_client, 2, 'users:password_change', None, 'get'),
+            (self.user_client, 8, 'users:password_change', {
+                'old_password': 'pass', 'new_password1': 'New-Secret-42',
+                'new_password2': 'New-Secret-42',
+            }, 'post'),
+            (self.user_client, 2, 'users:password_change_done', None,
+             'get'),
+            (self.guest, 4, 'users:password_reset_form', None, 'get'),
+            (self.guest, 1, 'users:password_reset_form',
+             {'email': 'user@example.com'}, 'post'),
+            (self.user_client, 4, 'users:logout', None, 'get'),
+        ):
+            with self.subTest(name=name, method=method):
+                with query_budget(budget):
+                    response = getattr(client, method)(reverse(name), data)
+                self.assertLess(response.status_code, 400)
@@ -50,6 +50,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -94,10 +97,18 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# подключение живёт CONN_MAX_AGE секунд и переиспользуется запросами
+# воркера; перед переиспользованием проверяется (core.db). По умолчанию
+# 0 - подключение закрывается в конце запроса; включается окружением
+# там, где воркеры долгоживущие
+CONN_MAX_AGE = int(os.environ.get('CONN_MAX_AGE', 0))
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
@@ -152,8 +163,77 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # My variables
 
 NUM_OF_POSTS: int = 10
+# веток комментариев на странице поста и в каждой догружаемой порции
+NUM_OF_COMMENTS: int = 20
+# ответов ветки на странице поста и в каждой догружаемой порции
+NUM_OF_REPLIES: int = 10
+# глубина ответов в ветке комментариев; глубже ответ идёт на уровень выше
+COMMENT_MAX_DEPTH: int = 4
+# keyset-пагинация лент по (pub_date, id) вместо номеров страниц
+CURSOR_PAGINATION = False
+# ниже этого числа строк пагинаторы лент и админки считают COUNT(*),
+# выше - берут счётчики или статистику базы (см. posts.utils)
+ESTIMATED_COUNT_THRESHOLD = 10000
+# время жизни кэша лент; свежесть обеспечивают поколения posts.generations
+FEED_CACHE_TIMEOUT = 60 * 60
+# кэш целых страниц для анонимов (см. core.pagecache); 0 - выключен
+PAGE_CACHE_TIMEOUT = 60 * 10
+# потоки для фоновой генерации миниатюр; 0 - генерировать сразу после
+# коммита (так в тестах, см. yatube.test_settings)
+THUMBNAIL_WORKERS = 2
+# реплика для чтения (см. core.routers); локально - копия основной
+# SQLite-базы, которую обновляет manage.py sync_replicas
+REPLICA_DB_PATH = os.environ.get('REPLICA_DB_PATH')
+if REPLICA_DB_PATH:
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': REPLICA_DB_PATH,
+        'CONN_MAX_AGE': CONN_MAX_AGE,
+        'CONN_HEALTH_CHECKS': True,
+    }
+DATABASE_REPLICAS = ['replica'] if REPLICA_DB_PATH else []
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# сколько секунд после записи пользователь читает основную базу
+REPLICA_STICKY_SECONDS = 10
+# доля запросов, замеряемых core.middleware.PerformanceMiddleware
+PERFORMANCE_SAMPLE_RATE = 1.0 if DEBUG else 0.05
+# общий каталог метрик воркеров (см. core.metrics); без него /metrics
+# показывает только свой процесс
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1
+# адреса, с которых /metrics отдаётся без входа персонала (через пробел),
+# например адрес Prometheus
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '').split()
+# PRAGMA каждого нового подключения к SQLite (см. core.db)
+SQLITE_PRAGMAS = {
+    # читатели не блокируют писателя, писатель - читателей
+    'journal_mode': 'wal',
+    # в режиме WAL fsync нужен только на контрольных точках
+    'synchronous': 'normal',
+    # отрицательное значение - в КиБ: 64 МБ кэша страниц на подключение
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    # сколько миллисекунд ждать блокировку, прежде чем вернуть ошибку
+    'busy_timeout': 5000,
+    'temp_store': 'memory',
+}
 DISP_LETTERS = 15
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 # LOGOUT_REDIRECT_URL = 'posts:index'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'yatube.performance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+            'propagate': False,
+        },
+    },
+}
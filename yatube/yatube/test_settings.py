@@ -0,0 +1,22 @@
+"""Настройки для тестов: основные настройки с поправками.
+
+manage.py test и pytest берут этот модуль вместо yatube.settings.
+"""
+from .settings import *  # noqa: F401,F403
+
+# фоновые потоки писали бы миниатюры во временный MEDIA_ROOT тестов
+# после его удаления и читали базу мимо транзакции теста
+THUMBNAIL_WORKERS = 0
+
+# реплику для тестов роутера; включают её только эти тесты через
+# override_settings(DATABASE_REPLICAS=['replica'])
+DATABASES['replica'] = {  # noqa: F405
+    'ENGINE': 'django.db.backends.sqlite3',
+    'NAME': os.path.join(BASE_DIR, 'replica.sqlite3'),  # noqa: F405
+    'CONN_MAX_AGE': CONN_MAX_AGE,  # noqa: F405
+    'CONN_HEALTH_CHECKS': True,
+}
+DATABASE_REPLICAS = []
+
+# отчёты о медленных запросах не засоряют вывод тестов
+LOGGING['loggers']['yatube.performance']['level'] = 'WARNING'  # noqa: F405